@@ -1,58 +1,169 @@
 #preshypily@gmail.com
-from flask import Flask, request, render_template, Response, url_for, send_from_directory
-from dash import Dash, dcc, html, Input, Output
+from flask import Flask, request, render_template, Response, url_for, send_from_directory, jsonify, g
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from datetime import datetime, timedelta
-import plotly.graph_objs as go
-import plotly.io as pio
-pio.renderers.default = "browser"
-from main import CreateLegacyChallenge, SimNatalChart
-from sims4_globe import Sims4Globe
+import hmac
+import os
+# First, so that with LEGACY_MEMORY_TRACE_FRAMES set the workbook load below is traced too
+from memory_budget import MemoryGuard, private_bytes, resident_bytes
+from main import CreateLegacyChallenge, SimNatalChart, describe_input_error, INPUT_ERRORS, natal_chart_from_inputs
+from legacy_data import CATEGORIES, DATA_REGISTRY, get_interpretation_index, pin_interpretation_index, unpin_interpretation_index
+from inverse_search import InverseSearch
+from legacy_planner import GenerationPlanner
+from legacy_scoring import get_scorer, legacy_results
+from legacy_rarity import get_rarity
+from chart_table import angle_codes, load_chart_table
+from result_cache import RESULT_CACHE, TTLCache
+from instrumentation import render_prometheus, span, timed
+from stage_executor import Overloaded, StageExecutor
+from dashboard import DASHBOARD_PREFIX, LazyDashboard
+from natal_figure import create_natal_chart, natal_chart_base
 
 app = Flask(__name__)
 
-# Create the Dash app instance
-dash_app = Dash(__name__, server=app, url_base_pathname='/dashboard/')
+# Parse the interpretation workbook once per worker at startup instead of per request, then
+# watch it (start_background_threads): an edited workbook is reloaded in the background without
+# restarting the workers
+get_interpretation_index()
+# Answer charts from the precomputed table when it has been built (python chart_table.py)
+SimNatalChart.CHART_TABLE = load_chart_table()
+
+# Figures per chart token, bounded and expired so nothing outlives its page view for long
+CHART_STORE = TTLCache(
+    int(os.environ.get('LEGACY_CHART_STORE_SIZE', 256)),
+    float(os.environ.get('LEGACY_CHART_TTL_SECONDS', 900))
+)
+
+# The dashboard iframe is a separate Dash app, built on its first request rather than at startup
+DASHBOARD = LazyDashboard(CHART_STORE)
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {DASHBOARD_PREFIX: DASHBOARD})
+
+CHART_INPUT_FIELDS = ['sim_age', 'sim_year_days', 'sim_season_days', 'birth_location', 'coordinates', 'current_sim_day']
+
+# Largest JSON array accepted by the batch endpoint
+BATCH_MAX_ITEMS = int(os.environ.get('LEGACY_BATCH_MAX_ITEMS', 1000))
+# Widest birth-year range, longest sim year, most birth dates (years x days, which the search's
+# time and memory grow with) and result count one inverse search may ask for
+SEARCH_MAX_YEARS = int(os.environ.get('LEGACY_SEARCH_MAX_YEARS', 5000))
+SEARCH_MAX_YEAR_DAYS = int(os.environ.get('LEGACY_SEARCH_MAX_YEAR_DAYS', 400))
+SEARCH_MAX_DATES = int(os.environ.get('LEGACY_SEARCH_MAX_DATES', 5000 * 28))
+SEARCH_MAX_RESULTS = 200
+INVERSE_SEARCH = InverseSearch()
+GENERATION_PLANNER = GenerationPlanner()
+# Chart requests run their legacy aggregation and figure build on a bounded pool; at most
+# LEGACY_MAX_CONCURRENT_REQUESTS are in flight per worker, later ones wait up to
+# LEGACY_QUEUE_TIMEOUT_SECONDS for a slot and are then answered 503 with Retry-After
+STAGE_EXECUTOR = StageExecutor(
+    int(os.environ.get('LEGACY_STAGE_WORKERS', 4)),
+    int(os.environ.get('LEGACY_MAX_CONCURRENT_REQUESTS', 16)),
+    float(os.environ.get('LEGACY_QUEUE_TIMEOUT_SECONDS', 1))
+)
+RETRY_AFTER_SECONDS = 1
+# /admin/* answers only requests carrying this token (Authorization: Bearer <token>); without
+# LEGACY_ADMIN_TOKEN the admin routes are switched off
+ADMIN_TOKEN = os.environ.get('LEGACY_ADMIN_TOKEN', '')
+# Most allocation sites /admin/memory lists
+MEMORY_REPORT_MAX_TOP = 50
+# Above LEGACY_MEMORY_BUDGET_MB of resident memory (0 = no budget) a worker drops its caches,
+# and a gunicorn worker still over budget after that is recycled (LEGACY_MEMORY_RECYCLE=0 to only evict)
+MEMORY_GUARD = MemoryGuard(
+    int(float(os.environ.get('LEGACY_MEMORY_BUDGET_MB', 0)) * 1024 * 1024),
+    os.environ.get('LEGACY_MEMORY_RECYCLE', '1') != '0'
+)
+MEMORY_GUARD.register('legacy_results', RESULT_CACHE.clear, RESULT_CACHE.__len__)
+MEMORY_GUARD.register('charts', CHART_STORE.clear, CHART_STORE.__len__)
+MEMORY_GUARD.register('plans', GENERATION_PLANNER.clear)
+MEMORY_GUARD.register('lot_angles', angle_codes.cache_clear, lambda: angle_codes.cache_info().currsize)
+
+# Set by gunicorn.conf.py when the gunicorn master imports the app before forking its workers
+PRELOADED = os.environ.get('LEGACY_PRELOADED') == '1'
+
+
+def start_background_threads():
+    # Threads don't survive fork, so a preloading master leaves this to each worker (post_fork)
+    DATA_REGISTRY.start(float(os.environ.get('LEGACY_DATA_RELOAD_SECONDS', 5)))
+    MEMORY_GUARD.start(float(os.environ.get('LEGACY_MEMORY_CHECK_SECONDS', 10)))
+
+
+def warm():
+    # Builds everything the first requests would otherwise build lazily, so a preloading master
+    # does it once and its workers share the result instead of each building a copy
+    index = get_interpretation_index()
+    get_scorer(index)
+    index.inverted_index()
+    get_rarity(index)
+    natal_chart_base()
+    DASHBOARD.load()
+
+
+if not PRELOADED:
+    start_background_threads()
+
+def generate_chart_from_inputs(inputs):
+    return natal_chart_from_inputs(inputs).generate_natal_chart()
+
+@app.before_request
+def pin_data_version():
+    # Every request sees one workbook snapshot from start to finish, even across a reload
+    g.data_token = pin_interpretation_index()
+
+@app.before_request
+def check_admin_token():
+    if request.path.startswith('/admin/'):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if not ADMIN_TOKEN or scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Not found"}), 404
+
+@app.after_request
+def report_data_version(response):
+    response.headers['X-Legacy-Data-Version'] = get_interpretation_index().version
+    return response
+
+@app.teardown_request
+def unpin_data_version(error=None):
+    token = g.pop('data_token', None)
+    if token is not None:
+        unpin_interpretation_index(token)
 
-# Define the Dash app's layout (includes the chart)
-dash_app.layout = html.Div([
-    dcc.Graph(id='natal-chart'),
-])
+@app.errorhandler(Overloaded)
+def overloaded(error):
+    headers = {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    if request.path.startswith('/api/'):
+        return jsonify({"error": str(error)}), 503, headers
+    return Response(f"{error}, please try again shortly\n", 503, headers, mimetype='text/plain')
 
-chart_data = None
-results_data = None
+def legacy_sets(natal_chart):
+    return CreateLegacyChallenge(natal_chart).filter_natal_chart()
+
+def build_figure(natal_chart):
+    with span("figure_build"):
+        return create_natal_chart(natal_chart)
 
 @app.route('/', methods=['GET', 'POST'])
+@timed("index_request")
 def index():
-    global chart_data, results_data
     if request.method == 'POST':
-        sim_age = int(request.form['sim_age'])
-        sim_year_days = int(request.form['sim_year_days'])
-        sim_season_days = int(request.form['sim_season_days'])
-        birth_location = request.form['birth_location']
-        coordinates = request.form['coordinates']
-        if coordinates:
-            try:
-                x, y, z = map(float, coordinates.split(','))
-            except ValueError:
-                x, y, z = 0.0, 0.0, 0.0  # Default coordinates if not provided or invalid
-        else:
-            x, y, z = 0.0, 0.0, 0.0  # Default coordinates if not provided
-        
-        current_sim_day = int(request.form['current_sim_day'])
-        
-        sims4_globe = Sims4Globe()
-        location = sims4_globe.get_location(birth_location, x, y, z)
-
-        natal_chart = SimNatalChart(sim_age, location, current_sim_day, sim_year_days, sim_season_days)
-        generated_chart = natal_chart.generate_natal_chart()
-
-        #print(generated_chart['planetary_positions'])
-        
-        legacychallenge = CreateLegacyChallenge(generated_chart['planetary_positions'])
-        traits_set, aspirations_set, careers_set, final_best_skills, final_worst_skills, seen_rules = legacychallenge.filter_natal_chart()
-
-        # Prepare data for the dashboard
-        chart_data = create_natal_chart(generated_chart['planetary_positions'])
+        with STAGE_EXECUTOR.admit():
+            generated_chart = generate_chart_from_inputs(request.form)
+
+            #print(generated_chart['planetary_positions'])
+
+            # The legacy sets and the dashboard figure are independent, so both stages run side by side
+            legacy = STAGE_EXECUTOR.submit(legacy_sets, generated_chart['planetary_positions'])
+            figure = STAGE_EXECUTOR.submit(build_figure, generated_chart['planetary_positions'])
+            traits_set, aspirations_set, careers_set, final_best_skills, final_worst_skills, seen_rules = legacy.result()
+
+            # Prepare data for the dashboard
+            # The compact chart's bytes as hex, so any worker can rebuild the figure from the token alone
+            chart_token = generated_chart['planetary_positions'].token
+            CHART_STORE.put(chart_token, figure.result())
+        # Share of all Sims with each result, precomputed per workbook version by legacy_rarity.py
+        rarity = get_rarity()
+        if rarity is not None:
+            rarity = {
+                category: rarity.annotate(category, items)
+                for category, items in zip(CATEGORIES, (traits_set, aspirations_set, careers_set, final_best_skills, final_worst_skills, seen_rules))
+            }
         results_data = {
             "Traits": traits_set,
             "Aspirations": aspirations_set,
@@ -62,18 +173,154 @@ def index():
             "Rules": seen_rules,
             "Natal_Chart": {
                     "formatted_birthdate": generated_chart["formatted_birthdate"]
-                }
+                },
+            "Rarity": rarity
             }
-        return render_template('index.html', results=results_data)
-    else:
-        chart_data = None
-        results_data = None
+        report_url = url_for('download_report', **{field: request.form[field] for field in CHART_INPUT_FIELDS})
+        with span("template_render"):
+            return render_template('index.html', results=results_data, report_url=report_url, chart_token=chart_token)
     return render_template('index.html')
 
+@app.route('/report.txt')
+def download_report():
+    # Text export of the results, rendered only when asked for and streamed back, never written to disk
+    generated_chart = generate_chart_from_inputs(request.args)
+    result_text = CreateLegacyChallenge(generated_chart['planetary_positions']).text_report()
+    return Response(
+        result_text,
+        mimetype='text/plain',
+        headers={'Content-Disposition': 'attachment; filename=natal_chart_results.txt'}
+    )
+
+def batch_results(natal_charts):
+    # One vectorised ephemeris pass for the whole batch; every chart shares the loaded workbook index
+    return legacy_results(SimNatalChart.generate_natal_charts(natal_charts))
+
+@app.route('/api/v1/legacy:batch', methods=['POST'])
+def legacy_batch():
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON array of Sims"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} Sims per batch"}), 413
+
+    results = [None] * len(items)
+    natal_charts, positions = [], []
+    for position, item in enumerate(items):
+        try:
+            natal_charts.append(natal_chart_from_inputs(item))
+            positions.append(position)
+        except INPUT_ERRORS as error:
+            results[position] = {"error": describe_input_error(error)}
+
+    with STAGE_EXECUTOR.admit():
+        for position, result in zip(positions, STAGE_EXECUTOR.submit(batch_results, natal_charts).result()):
+            results[position] = result
+    return jsonify({"results": results})
+
+@app.route('/api/v1/legacy:rarity')
+def legacy_rarity():
+    category = request.args.get('category')
+    if category is not None and category not in CATEGORIES:
+        return jsonify({"error": f"Unknown category '{category}', expected one of {', '.join(CATEGORIES)}"}), 400
+    rarity = get_rarity()
+    if rarity is None:
+        version = get_interpretation_index().version
+        return jsonify({"error": f"No rarity statistics for workbook version {version}, run python legacy_rarity.py"}), 404
+    return jsonify(rarity.to_dict([category] if category else CATEGORIES))
+
+@app.route('/api/v1/legacy:search', methods=['POST'])
+def legacy_search():
+    query = request.get_json(silent=True)
+    if not isinstance(query, dict) or not isinstance(query.get("want"), dict):
+        return jsonify({"error": "Expected a JSON object with a \"want\" mapping of category to items"}), 400
+    try:
+        first_year, last_year = int(query.get("first_year", 0)), int(query.get("last_year", 100))
+        sim_year_days = int(query.get("sim_year_days", 28))
+        limit = max(1, min(int(query.get("limit", 20)), SEARCH_MAX_RESULTS))
+        current_sim_day = query.get("current_sim_day")
+        current_sim_day = None if current_sim_day is None else int(current_sim_day)
+        if not 0 < sim_year_days <= SEARCH_MAX_YEAR_DAYS or not 0 <= last_year - first_year < SEARCH_MAX_YEARS:
+            raise ValueError(
+                f"Expected sim_year_days from 1 to {SEARCH_MAX_YEAR_DAYS} and at most {SEARCH_MAX_YEARS} birth years")
+        if (last_year - first_year + 1) * sim_year_days > SEARCH_MAX_DATES:
+            raise ValueError(f"At most {SEARCH_MAX_DATES} birth dates (years x sim_year_days) per search")
+        with STAGE_EXECUTOR.admit():
+            results = STAGE_EXECUTOR.submit(
+                INVERSE_SEARCH.search,
+                query["want"], first_year, last_year, sim_year_days, query.get("worlds"), limit, current_sim_day).result()
+    except (TypeError, ValueError) as error:
+        return jsonify({"error": str(error)}), 400
+    return jsonify({"results": results})
+
+@app.route('/api/v1/legacy:plan', methods=['POST'])
+def legacy_plan():
+    query = request.get_json(silent=True)
+    if not isinstance(query, dict) or not isinstance(query.get("timelines"), list):
+        return jsonify({"error": "Expected a JSON object with a \"timelines\" array"}), 400
+    try:
+        if sum(len(timeline["heirs"]) for timeline in query["timelines"]) > BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {BATCH_MAX_ITEMS} heirs per plan"}), 413
+        with STAGE_EXECUTOR.admit():
+            plans = STAGE_EXECUTOR.submit(
+                GENERATION_PLANNER.plan_many,
+                query["timelines"], int(query["current_sim_day"]),
+                int(query.get("sim_year_days", 28)), int(query.get("sim_season_days", 7))).result()
+    except INPUT_ERRORS as error:
+        return jsonify({"error": describe_input_error(error)}), 400
+    return jsonify({"plans": plans})
+
 @app.route('/health')
 def health():
     return 'OK', 200
 
+@app.route('/metrics')
+def metrics():
+    counters = []
+    for cache_name, cache in (("result_cache", RESULT_CACHE), ("chart_store", CHART_STORE)):
+        stats = cache.stats()
+        counters.extend([
+            (f"legacy_{cache_name}_hits_total", f"Lookups answered from the {cache_name}.", "counter", stats["hits"]),
+            (f"legacy_{cache_name}_misses_total", f"Lookups missing from the {cache_name}.", "counter", stats["misses"]),
+            (f"legacy_{cache_name}_entries", f"Entries currently held in the {cache_name}.", "gauge", stats["size"]),
+        ])
+    counters.append(("legacy_data_reloads_total", "Workbook snapshots swapped in since start.", "counter", DATA_REGISTRY.reloads))
+    executor = STAGE_EXECUTOR.stats()
+    counters.extend([
+        ("legacy_requests_in_flight", "Chart requests currently holding an executor slot.", "gauge", executor["active"]),
+        ("legacy_requests_rejected_total", "Chart requests turned away with 503 because every slot was busy.", "counter", executor["rejected"]),
+        ("legacy_memory_evictions_total", "Times the caches were cleared for going over the memory budget.", "counter", MEMORY_GUARD.evictions),
+    ])
+    rss = resident_bytes()
+    if rss is not None:
+        counters.extend([
+            ("legacy_worker_resident_bytes", "Resident memory of this worker.", "gauge", rss),
+            ("legacy_worker_private_bytes", "Resident memory of this worker not shared with the master or other workers.", "gauge", private_bytes()),
+        ])
+    return Response(render_prometheus(counters), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/data')
+def data_stats():
+    return jsonify(DATA_REGISTRY.stats())
+
+@app.route('/admin/executor')
+def executor_stats():
+    return jsonify(STAGE_EXECUTOR.stats())
+
+@app.route('/admin/memory')
+def memory_stats():
+    top = min(max(request.args.get('top', 10, type=int), 1), MEMORY_REPORT_MAX_TOP)
+    return jsonify(MEMORY_GUARD.report(top))
+
+@app.route('/admin/cache')
+def cache_stats():
+    return jsonify({"legacy_results": RESULT_CACHE.stats(), "charts": CHART_STORE.stats()})
+
+# Routes crawlers have no use for: admin and monitoring endpoints, the JSON APIs, and the report
+# download, which needs a chart's inputs as query arguments
+SITEMAP_EXCLUDED_PREFIXES = ('/admin/', '/metrics', '/api/')
+SITEMAP_EXCLUDED_ENDPOINTS = {'download_report'}
+
 @app.route('/sitemap.xml', methods=['GET'])
 def sitemap():
     """Generate sitemap.xml dynamically."""
@@ -82,6 +329,8 @@ def sitemap():
 
     # Static pages
     for rule in app.url_map.iter_rules():
+        if rule.rule.startswith(SITEMAP_EXCLUDED_PREFIXES) or rule.endpoint in SITEMAP_EXCLUDED_ENDPOINTS:
+            continue
         if "GET" in rule.methods and len(rule.arguments) == 0:
             url = url_for(rule.endpoint, _external=True)
             pages.append([url, ten_days_ago])
@@ -94,288 +343,5 @@ def sitemap():
 def robots_txt():
     return send_from_directory(app.static_folder, 'robots.txt')
 
-@dash_app.callback(
-    Output('natal-chart', 'figure'),
-    Input('natal-chart', 'id')
-)
-
-def update_chart(_):
-    return chart_data if chart_data else go.Figure()
-
-def create_natal_chart(natal_chart):
-    #print(natal_chart)
-    # Element colors
-    element_colors = {
-        "Wood": "burlywood",
-        "Fire": "red",
-        "Earth": "green",
-        "Metal": "lavender",
-        "Water": "mediumaquamarine",
-        "Air": "darkslategrey"
-    }
-
-    # Zodiac to element mapping
-    zodiac_elements = {
-        "Aries": "Wood",
-        "Taurus": "Earth",
-        "Gemini": "Air",
-        "Cancer": "Water",
-        "Leo": "Fire",
-        "Virgo": "Earth",
-        "Libra": "Air",
-        "Scorpio": "Metal",
-        "Sagittarius": "Fire",
-        "Capricorn": "Earth",
-        "Aquarius": "Air",
-        "Pisces": "Water"
-    }
-
-    planets = list(natal_chart.keys())
-
-    exclude_planets = ["midheaven", "ic", "ascendant", "descendant"]
-    planets = [planet for planet in planets if planet not in exclude_planets]
-
-    # Calculate the angles based on the house number and sign position
-    zodiac_signs = [
-        "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra",
-        "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
-    ]
-
-    angles = []
-    for planet in planets:
-        house = natal_chart[planet]['house']
-        sign_index = zodiac_signs.index(natal_chart[planet]['sign'])
-        angle = ((house - 1) * 30 + sign_index * 30 / 12) % 360
-        angles.append(angle)
-
-    # Correcting specific planets based on observed errors
-    def correct_angle(planet, correction):
-        index = planets.index(planet)
-        angles[index] = (angles[index] + correction) % 360
-
-    # Apply corrections for specific planets
-    correct_angle('jupiter', -15)
-    correct_angle('saturn', -15)
-    correct_angle('neptune', -15)
-    correct_angle('north_node', -15)
-    correct_angle('fortune', -15)
-    correct_angle('vertex', -20)
-    correct_angle('pluto', -15)
-
-    fig = go.Figure()
-
-
-
-    # Offset for overlapping planets
-    offset_radius = 0.04
-    adjusted_angles = []
-    seen_angles = {}
-
-    for angle in angles:
-        if angle in seen_angles:
-            seen_angles[angle] += 1
-            adjusted_angle = angle + seen_angles[angle] * (360 / len(planets))
-        else:
-            seen_angles[angle] = 0
-            adjusted_angle = angle
-        adjusted_angles.append(adjusted_angle)
-
-    adjusted_radii = [1 + seen_angles[angle] * offset_radius for angle in angles]
-
-
-    # Matching colors for each planet
-    planet_colors_map = {
-        "pluto": "black",
-        "moon": "white",
-        "mars": "red",
-        "sun": "yellow",
-        "uranus": "blue",
-        "venus": "green",
-        "jupiter": "orange",
-        "neptune": "violet",
-        "saturn": "grey",
-        "mercury": "brown",
-        "north_node": "darkslateblue",
-        "south_node": "darksalmon",
-        "vertex": "mediumaquamarine",
-        "chiron": "darkgrey",
-        "lilith": "hotpink",
-        "fortune": "mintcream"
-    }
-    planet_colors = [planet_colors_map[planet] for planet in planets]
-
-    # Adding the planets
-    for planet, angle, radius in zip(planets, adjusted_angles, adjusted_radii):
-        if planet not in ["mc", "ic", "ascendant", "descendant"]:
-            sign = natal_chart[planet]['sign']
-            element = zodiac_elements[sign]
-            border_color = element_colors[element]
-
-            fig.add_trace(go.Scatterpolar(
-                r=[radius],
-                theta=[angle],
-                mode='markers',
-                marker=dict(size=15, color=planet_colors_map[planet], line=dict(color=border_color, width=2)),
-                hoverinfo='text',
-                text=[f"{planet.capitalize()}: {sign} {natal_chart[planet]['house']}"],
-                showlegend=True,
-                name=f"{planet.capitalize()} ({sign} {natal_chart[planet]['house']})"
-            ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=adjusted_radii,
-        theta=adjusted_angles,
-        mode='text',
-        text=planets,
-        textposition='top center',
-        textfont=dict(color='rgba(0,0,0,0)'),
-        hoverinfo='none',
-        showlegend=False
-    ))
-
-    # Adding the zodiac signs
-    zodiac_signs = [
-        "Pisces", "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
-        "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius"
-    ]
-
-    for i, sign in enumerate(zodiac_signs):
-        angle = (i * 30 + 15) % 360
-        fig.add_trace(go.Scatterpolar(
-            r=[1.2],
-            theta=[angle],
-            mode='text',
-            text=sign,
-            textposition='middle center',
-            hoverinfo='none',
-            showlegend=False
-        ))
-
-    # Adding the house numbers
-    house_angles = [(i * 30 + 15) % 360 for i in range(12)]
-    house_numbers = list(range(1, 13))
-
-    for angle, house in zip(house_angles, house_numbers):
-        fig.add_trace(go.Scatterpolar(
-            r=[0.3],
-            theta=[angle],
-            mode='text',
-            text=[f"{house}"],
-            textposition='middle center',
-            hoverinfo='none',
-            showlegend=False
-        ))
-
-    # Adding MC, IC, Ascendant, and Descendant lines and legends
-    mc_sign = natal_chart["midheaven"]['sign']
-    ic_sign = natal_chart["ic"]['sign']
-    asc_sign = natal_chart["ascendant"]['sign']
-    dc_sign = natal_chart["descendant"]['sign']
-
-    mc_color = element_colors[zodiac_elements[mc_sign]]
-    ic_color = element_colors[zodiac_elements[ic_sign]]
-    asc_color = element_colors[zodiac_elements[asc_sign]]
-    dc_color = element_colors[zodiac_elements[dc_sign]]
-
-    mc_angle = (natal_chart["midheaven"]['house'] - 1) * 30 + (zodiac_signs.index(mc_sign) * 30) / 12
-    ic_angle = (natal_chart["ic"]['house'] - 1) * 30 + (zodiac_signs.index(ic_sign) * 30) / 12
-    asc_angle = (natal_chart["ascendant"]['house'] - 1) * 30 + (zodiac_signs.index(asc_sign) * 30) / 12
-    dc_angle = (natal_chart["descendant"]['house'] - 1) * 30 + (zodiac_signs.index(dc_sign) * 30) / 12
-
-    fig.add_trace(go.Scatterpolar(
-        r=[0, 1],
-        theta=[mc_angle, mc_angle],
-        mode='lines',
-        line=dict(color=mc_color, dash='dash', width=2),
-        opacity=0.5,
-        showlegend=True,
-        name="MC"
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=[0, 1],
-        theta=[ic_angle, ic_angle],
-        mode='lines',
-        line=dict(color=ic_color, dash='dash', width=2),
-        opacity=0.5,
-        showlegend=True,
-        name="IC"
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=[0, 1],
-        theta=[asc_angle, asc_angle],
-        mode='lines',
-        line=dict(color=asc_color, dash='dash', width=2),
-        opacity=0.5,
-        showlegend=True,
-        name="Asc"
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=[0, 1],
-        theta=[dc_angle, dc_angle],
-        mode='lines',
-        line=dict(color=dc_color, dash='dash', width=2),
-        opacity=0.5,
-        showlegend=True,
-        name="Dsc"
-    ))
-
-
-    # Adding labels for MC, IC, Ascendant, and Descendant
-    fig.add_trace(go.Scatterpolar(
-        r=[1.05],
-        theta=[mc_angle],
-        mode='text',
-        text=["MC"],
-        textposition='middle right',
-        hoverinfo='none',
-        showlegend=False
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=[1.05],
-        theta=[ic_angle],
-        mode='text',
-        text=["IC"],
-        textposition='middle left',
-        hoverinfo='none',
-        showlegend=False
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=[1.05],
-        theta=[asc_angle],
-        mode='text',
-        text=["   Asc"],
-        textposition='middle left',
-        hoverinfo='none',
-        showlegend=False
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=[1.05],
-        theta=[dc_angle],
-        mode='text',
-        text=["Dsc"],
-        textposition='middle right',
-        hoverinfo='none',
-        showlegend=False
-    ))
-
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(visible=False, range=[0, 1.25]),
-            angularaxis=dict(visible=True, tickmode='array', tickvals=[i * 30 for i in range(12)], ticktext=zodiac_signs, showticklabels=False)
-        ),
-        showlegend=True,
-        margin=dict(l=40, r=40, b=40, t=40)
-    )
-
-    return fig
-
-
-
 if __name__ == '__main__':
     app.run(host='0.0.0.0', debug=True)
@@ -0,0 +1,96 @@
+#preshypily@gmail.com
+# Per-request latency of CreateLegacyChallenge.filter_natal_chart before and after
+# the workbook was moved into a process-wide index. The result cache is cleared before every
+# timed call, so "after" measures the indexed aggregation rather than a cache hit, which is
+# reported on its own line. Startup is timed both ways: loading the npz sidecar and a cold
+# build from the workbook.
+#
+#   python benchmarks/bench_filter_natal_chart.py [--repeat N]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pandas as pd
+
+from legacy_data import SIDECAR_PATH, WORKBOOK_PATH, InterpretationIndex, get_interpretation_index, workbook_version
+from main import CreateLegacyChallenge, SimNatalChart
+from result_cache import RESULT_CACHE
+from sims4_globe import GLOBE
+
+
+def sample_chart():
+    location = GLOBE.get_location("Willow Creek", 0.0, 0.0, 0.0)
+    return SimNatalChart(120, location, 1000).generate_natal_chart()['planetary_positions']
+
+
+def read_workbook_and_match(natal_chart):
+    # What every request paid before: parse the XLSX, then one boolean-mask scan per planet
+    df = pd.read_excel(WORKBOOK_PATH, engine='openpyxl')
+    matching_rows = []
+    for planet, info in natal_chart.items():
+        matches = df[(df['Planet'] == planet.title())
+                     & (df['Zodiac'] == info['sign']) &
+                     (df['House'] == info['house'])]
+        matching_rows.append(matches)
+    return pd.concat(matching_rows)
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='filter_natal_chart latency before/after the workbook index')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    natal_chart = sample_chart()
+
+    with open(WORKBOOK_PATH, 'rb') as file:
+        data = file.read()
+    version = workbook_version(data)
+    sidecar_ms = None
+    if InterpretationIndex.from_sidecar(SIDECAR_PATH, version) is not None:
+        sidecar_ms = time_call(lambda: InterpretationIndex.from_sidecar(SIDECAR_PATH, version), args.repeat)[0] * 1000
+    build_ms = time_call(lambda: InterpretationIndex.from_workbook_bytes(data), max(1, args.repeat // 5))[0] * 1000
+
+    get_interpretation_index()
+    legacy = CreateLegacyChallenge(natal_chart)
+
+    def before():
+        read_workbook_and_match(natal_chart)
+        RESULT_CACHE.clear()
+        legacy.filter_natal_chart()
+
+    def after():
+        RESULT_CACHE.clear()
+        legacy.filter_natal_chart()
+
+    before_median, before_best = time_call(before, args.repeat)
+    after_median, after_best = time_call(after, args.repeat)
+    legacy.filter_natal_chart()
+    cached_median, cached_best = time_call(legacy.filter_natal_chart, args.repeat)
+
+    if sidecar_ms is None:
+        print(f"index load at startup from the sidecar: no sidecar for this workbook at {SIDECAR_PATH}")
+    else:
+        print(f"index load at startup from the sidecar: {sidecar_ms:8.2f} ms")
+    print(f"index build at startup from the workbook (cold): {build_ms:8.2f} ms")
+    print(f"before (read_excel + mask scans per request): median {before_median * 1000:8.2f} ms, best {before_best * 1000:8.2f} ms")
+    print(f"after  (indexed filter_natal_chart, result cache cleared): median {after_median * 1000:8.2f} ms, best {after_best * 1000:8.2f} ms")
+    print(f"speedup: {before_median / after_median:.1f}x")
+    print(f"result cache hit (repeat requests for the same chart): median {cached_median * 1000:8.3f} ms, best {cached_best * 1000:8.3f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#preshypily@gmail.com
+# Startup guard: imports each entry-point module in a fresh interpreter, reports how long the
+# import took and fails when a module pulls in a heavy optional dependency it shouldn't, or
+# goes over its time budget.
+#
+#   python benchmarks/bench_import_time.py [--repeat N] [--budget-scale 2.0]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only by the features that need them: workbook parsing, figures and the dashboard
+HEAVY = {'pandas', 'plotly', 'dash', 'IPython', 'openpyxl'}
+
+# module: (packages it may import from HEAVY, import budget in ms)
+MODULES = {
+    'main': (set(), 400),
+    'legacy_data': (set(), 400),
+    'chart_table': (set(), 400),
+    'inverse_search': (set(), 400),
+    'legacy_planner': (set(), 400),
+    'legacy_rarity': (set(), 400),
+    'natal_figure': (set(), 400),
+    'bulk': (set(), 400),
+    'app': (set(), 1000),
+}
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "packages": sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+
+def measure(module, repeat):
+    samples, packages = [], set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module)], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["seconds"] * 1000)
+        packages = set(result["packages"])
+    return statistics.median(samples), packages & HEAVY
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and guard the import of every entry-point module')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='multiply every time budget (slow machines)')
+    args = parser.parse_args()
+
+    failures = []
+    for module, (allowed, budget_ms) in MODULES.items():
+        median_ms, heavy = measure(module, args.repeat)
+        budget_ms *= args.budget_scale
+        problems = []
+        if heavy - allowed:
+            problems.append(f"imports {', '.join(sorted(heavy - allowed))}")
+        if median_ms > budget_ms:
+            problems.append(f"over its {budget_ms:.0f} ms budget")
+        print(f"{module:16s} median {median_ms:8.1f} ms   {'; '.join(problems) or 'ok'}")
+        failures.extend(f"{module} {problem}" for problem in problems)
+    if failures:
+        sys.exit("Import guard failed: " + ", ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
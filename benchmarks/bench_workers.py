@@ -0,0 +1,117 @@
+#preshypily@gmail.com
+# Memory and spawn time of gunicorn with and without preloading (gunicorn.conf.py). For each
+# worker count it starts gunicorn, sends every worker some chart requests, then sums the
+# proportional set size (shared pages split between the processes sharing them) of the master
+# and its workers and reports each worker's private memory. It also kills the worker of a
+# one-worker server and times how long until the replacement answers. Linux only (/proc).
+#
+#   python benchmarks/bench_workers.py --workers 1 2 4 8
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from load_test import chart_inputs, free_port, timed_call
+
+REQUESTS_PER_WORKER = 20
+
+
+def memory_of(pid):
+    # {"pss": bytes, "private": bytes} from /proc/<pid>/smaps_rollup
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {"pss": fields.get('Pss', 0), "private": fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)}
+
+
+def children_of(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as children:
+        return [int(child) for child in children.read().split()]
+
+
+def start(workers, preload):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0', LEGACY_STAGE_WORKERS='0')
+    server = subprocess.Popen(
+        ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    while timed_call(f"{url}/health")[0] != 200 or len(children_of(server.pid)) < workers:
+        if time.perf_counter() - started > 120 or server.poll() is not None:
+            server.kill()
+            raise RuntimeError("gunicorn did not come up")
+        time.sleep(0.05)
+    return server, url, time.perf_counter() - started
+
+
+def wait_until_serving(url, deadline):
+    started = time.perf_counter()
+    while timed_call(f"{url}/health")[0] != 200:
+        if time.perf_counter() - started > deadline:
+            raise RuntimeError("no worker came back")
+        time.sleep(0.01)
+    return time.perf_counter() - started
+
+
+def measure(workers, preload):
+    server, url, startup = start(workers, preload)
+    try:
+        for number in range(workers * REQUESTS_PER_WORKER):
+            body = urllib.parse.urlencode(chart_inputs(number)).encode()
+            timed_call(urllib.request.Request(f"{url}/", body))
+        pids = children_of(server.pid)
+        memory = [memory_of(pid) for pid in pids]
+        total_pss = memory_of(server.pid)["pss"] + sum(usage["pss"] for usage in memory)
+        return {
+            "workers": workers,
+            "preload": preload,
+            "startup_s": round(startup, 3),
+            "total_pss_mb": round(total_pss / 2**20, 1),
+            "worker_private_mb": round(sum(usage["private"] for usage in memory) / len(memory) / 2**20, 1),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def respawn(preload):
+    # Seconds from SIGKILL of the only worker until its replacement answers /health
+    server, url, _ = start(1, preload)
+    try:
+        worker = children_of(server.pid)[0]
+        started = time.perf_counter()
+        os.kill(worker, signal.SIGKILL)
+        while children_of(server.pid) in ([], [worker]):
+            time.sleep(0.001)
+        wait_until_serving(url, 120)
+        return round(time.perf_counter() - started, 3)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn memory and spawn time with and without preload')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    results = [measure(workers, preload) for preload in (False, True) for workers in args.workers]
+    respawn_seconds = {"preload": respawn(True), "no_preload": respawn(False)}
+    print(json.dumps({"runs": results, "respawn_s": respawn_seconds}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
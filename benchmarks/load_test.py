@@ -0,0 +1,186 @@
+#preshypily@gmail.com
+# Concurrent load test for the chart endpoints: N clients post charts (or batches) as fast as
+# they can while a prober times /health, so a run shows throughput, latency percentiles, how
+# many requests were shed with 503, and whether health checks stay fast under load.
+#
+#   python benchmarks/load_test.py --clients 64 --seconds 20
+#   python benchmarks/load_test.py --url http://127.0.0.1:8000 --endpoint batch
+#
+# Without --url the app is started in a subprocess, under gunicorn's threaded worker when
+# gunicorn is installed and the threaded Werkzeug server otherwise.
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sims4_globe import areas
+
+SIM_YEAR_DAYS, SIM_SEASON_DAYS, CURRENT_SIM_DAY = 28, 7, 5000
+BATCH_SIZE = 20
+
+
+def chart_inputs(number):
+    worlds = list(areas)
+    return {
+        'sim_age': str(number * 7 % 2000),
+        'sim_year_days': str(SIM_YEAR_DAYS),
+        'sim_season_days': str(SIM_SEASON_DAYS),
+        'birth_location': worlds[number % len(worlds)],
+        'coordinates': '0,0,0',
+        'current_sim_day': str(CURRENT_SIM_DAY),
+    }
+
+
+def build_request(url, endpoint, number):
+    if endpoint == 'batch':
+        body = json.dumps([chart_inputs(number * BATCH_SIZE + item) for item in range(BATCH_SIZE)]).encode()
+        return urllib.request.Request(f"{url}/api/v1/legacy:batch", body, {'Content-Type': 'application/json'})
+    body = urllib.parse.urlencode(chart_inputs(number)).encode()
+    return urllib.request.Request(f"{url}/", body, {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+def timed_call(call):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(call, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except OSError:
+        status = None
+    return status, time.perf_counter() - started
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda fraction: samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+    }
+
+
+def drive(url, endpoint, numbers, deadline):
+    # One client process: a thread per client number, posting until the wall-clock deadline
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def client(number):
+        sent = 0
+        while time.time() < deadline:
+            status, elapsed = timed_call(build_request(url, endpoint, number * 100003 + sent))
+            sent += 1
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+            if status == 503:
+                time.sleep(0.05)
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in numbers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+
+def probe(url, deadline):
+    # Health checks from their own process, so client-side contention doesn't inflate them
+    health = []
+    while time.time() < deadline:
+        status, elapsed = timed_call(f"{url}/health")
+        if status == 200:
+            health.append(elapsed)
+        time.sleep(0.05)
+    return health
+
+
+def run(url, endpoint, clients, seconds, processes):
+    deadline = time.time() + seconds
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(processes + 1) as pool:
+        health = pool.submit(probe, url, deadline)
+        shares = [pool.submit(drive, url, endpoint, range(start, clients, processes), deadline) for start in range(processes)]
+        for share in shares:
+            share_latencies, share_statuses = share.result()
+            latencies.extend(share_latencies)
+            for status, count in share_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+        health = health.result()
+    elapsed = time.perf_counter() - started
+
+    charts = len(latencies) * (BATCH_SIZE if endpoint == 'batch' else 1)
+    return {
+        "endpoint": endpoint,
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "charts_per_second": round(charts / elapsed, 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "latency": percentiles(latencies),
+        "health_latency": percentiles(health),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, threads):
+    if shutil.which('gunicorn'):
+        command = ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--worker-class', 'gthread', '--threads', str(threads)]
+    else:
+        command = [sys.executable, '-c', f"from app import app; app.run(port={port}, threaded=True)"]
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        if timed_call(f"{url}/health")[0] == 200:
+            return server, url
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("The app did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the chart endpoints with concurrent clients')
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    parser.add_argument('--endpoint', choices=['index', 'batch'], default='index')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--processes', type=int, default=4, help='client processes the clients are spread over')
+    parser.add_argument('--threads', type=int, default=64, help='gunicorn threads when starting the server')
+    args = parser.parse_args()
+
+    server, url = (None, args.url.rstrip('/')) if args.url else start_server(free_port(), args.threads)
+    try:
+        print(json.dumps(run(url, args.endpoint, args.clients, args.seconds, max(1, min(args.processes, args.clients))), indent=2))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#preshypily@gmail.com
+# Stage-by-stage benchmark of the chart-to-legacy pipeline, swept over every world in
+# sims4_globe.areas and a range of Sim ages. Results are written as JSON so runs from
+# different commits can be compared:
+#
+#   python benchmarks/run_benchmarks.py --output bench.json
+#   python benchmarks/run_benchmarks.py --compare bench.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from app import app
+from legacy_data import InterpretationIndex, get_interpretation_index
+from legacy_scoring import get_scorer
+from main import CreateLegacyChallenge, SimNatalChart
+from natal_figure import create_natal_chart
+from result_cache import RESULT_CACHE
+from sims4_globe import GLOBE, LOT_TILES, areas
+
+SIM_AGES = list(range(0, 2001, 125))
+CURRENT_SIM_DAYS = [500, 5000]
+SIM_YEAR_DAYS, SIM_SEASON_DAYS = 28, 7
+
+
+def sweep():
+    for world in areas:
+        location = GLOBE.get_location(world, 0.0, 0.0, 0.0)
+        for sim_age in SIM_AGES:
+            for current_sim_day in CURRENT_SIM_DAYS:
+                yield world, location, sim_age, current_sim_day
+
+
+def summarize(samples_ns):
+    samples_us = sorted(sample / 1000 for sample in samples_ns)
+    return {
+        "n": len(samples_us),
+        "mean_us": statistics.fmean(samples_us),
+        "median_us": statistics.median(samples_us),
+        "p95_us": samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.95))],
+        "min_us": samples_us[0],
+    }
+
+
+def time_each(func, args_list, repeat, before=None):
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            if before is not None:
+                before()
+            start = time.perf_counter_ns()
+            func(*args)
+            samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeat, workbook_repeat):
+    inputs = list(sweep())
+    natal_charts = [SimNatalChart(age, location, day, SIM_YEAR_DAYS, SIM_SEASON_DAYS) for _, location, age, day in inputs]
+    positions = [natal_chart.calculate_planetary_positions(natal_chart.jd) for natal_chart in natal_charts]
+    zodiac_charts = [natal_chart.assign_to_zodiac_and_houses(position) for natal_chart, position in zip(natal_charts, positions)]
+    index = get_interpretation_index()
+    code_rows = index.code_rows(SimNatalChart.BODIES, SimNatalChart.ZODIAC_SIGNS)
+
+    def match_rows(zodiac_chart):
+        return [rows[code] for rows, code in zip(code_rows, zodiac_chart.codes)]
+
+    row_ids = [match_rows(zodiac_chart) for zodiac_chart in zodiac_charts]
+    forms = [
+        {
+            'sim_age': str(age), 'sim_year_days': str(SIM_YEAR_DAYS), 'sim_season_days': str(SIM_SEASON_DAYS),
+            'birth_location': world, 'coordinates': '0, 0, 0', 'current_sim_day': str(day)
+        }
+        for world, _, age, day in inputs
+    ]
+    client = app.test_client()
+
+    # Coordinates spread over (and past) each world's lots, resolved one at a time and as one array
+    coordinates = [(world, number * LOT_TILES / 3, 0.0, -number * LOT_TILES / 2) for number, (world, *_) in enumerate(inputs)]
+    coordinate_arrays = [list(values) for values in zip(*coordinates)]
+
+    stages = {}
+    stages["get_location"] = time_each(GLOBE.get_location, coordinates, repeat)
+    stages["locate_sweep"] = time_each(
+        GLOBE.locate, [(coordinate_arrays[0], coordinate_arrays[1], coordinate_arrays[3])], repeat)
+    stages["calculate_birthdate"] = time_each(SimNatalChart.calculate_birthdate, [(c,) for c in natal_charts], repeat)
+    stages["julian_date"] = time_each(
+        SimNatalChart.julian_date, [(c, c.birthdate) for c in natal_charts], repeat)
+    stages["calculate_planetary_positions"] = time_each(
+        SimNatalChart.calculate_planetary_positions, [(c, c.jd) for c in natal_charts], repeat)
+    stages["assign_to_zodiac_and_houses"] = time_each(
+        SimNatalChart.assign_to_zodiac_and_houses, list(zip(natal_charts, positions)), repeat)
+    stages["generate_natal_chart"] = time_each(SimNatalChart.generate_natal_chart, [(c,) for c in natal_charts], repeat)
+    stages["workbook_load"] = time_each(InterpretationIndex.from_workbook, [()], workbook_repeat)
+    if InterpretationIndex.from_sidecar() is not None:
+        stages["sidecar_load"] = time_each(InterpretationIndex.from_sidecar, [()], workbook_repeat)
+    stages["row_matching"] = time_each(match_rows, [(z,) for z in zodiac_charts], repeat)
+    stages["token_counting"] = time_each(
+        lambda ids: index.count_tokens(row_id for row_id in ids if row_id is not None), [(ids,) for ids in row_ids], repeat)
+    stages["filter_natal_chart_uncached"] = time_each(
+        lambda z: CreateLegacyChallenge(z).filter_natal_chart(), [(z,) for z in zodiac_charts], repeat,
+        before=RESULT_CACHE.clear)
+    stages["filter_natal_chart_cached"] = time_each(
+        lambda z: CreateLegacyChallenge(z).filter_natal_chart(), [(z,) for z in zodiac_charts], repeat)
+    scorer = get_scorer(index)
+    sweep_codes = np.frombuffer(b''.join(z.codes for z in zodiac_charts), dtype=np.uint8).reshape(len(zodiac_charts), -1)
+    # The whole sweep as one batch, so this is the time for len(inputs) charts
+    stages["batch_scoring_sweep"] = time_each(scorer.score, [(sweep_codes,)], repeat)
+    stages["create_natal_chart"] = time_each(create_natal_chart, [(z,) for z in zodiac_charts], repeat)
+    stages["post_index_end_to_end"] = time_each(
+        lambda form: client.post('/', data=form), [(form,) for form in forms], repeat)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "chart_table_loaded": SimNatalChart.CHART_TABLE is not None,
+        "sweep": {"worlds": len(areas), "sim_ages": SIM_AGES, "current_sim_days": CURRENT_SIM_DAYS, "repeat": repeat},
+        "stages": stages,
+    }
+
+
+def print_report(results, baseline=None, file=sys.stderr):
+    print(f"revision {results['revision']}, {results['sweep']['worlds']} worlds x {len(results['sweep']['sim_ages'])} ages",
+          file=file)
+    for stage, stats in results["stages"].items():
+        line = f"{stage:32s} median {stats['median_us']:10.1f} us   p95 {stats['p95_us']:10.1f} us"
+        if baseline and stage in baseline["stages"]:
+            before = baseline["stages"][stage]["median_us"]
+            line += f"   {(stats['median_us'] - before) / before * 100:+7.1f}% vs {(baseline['revision'] or '?')[:8]}"
+        print(line, file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the chart-to-legacy pipeline')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the input sweep per stage')
+    parser.add_argument('--workbook-repeat', type=int, default=3, help='timed workbook parses')
+    parser.add_argument('--output', help='write the JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', help='JSON results of an earlier run to show relative changes against')
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.workbook_repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    # Human-readable summary on stderr, JSON on stdout or --output
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
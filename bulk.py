@@ -0,0 +1,119 @@
+#preshypily@gmail.com
+# Offline bulk calculator: streams Sims from a CSV or JSONL file through SimNatalChart and
+# CreateLegacyChallenge on a process pool and appends one JSON result per line.
+#
+#   python bulk.py sims.csv results.jsonl --workers 8
+#   python bulk.py sims.jsonl results.jsonl --resume-from 120000
+#
+# Input rows use the form's field names: sim_age, birth_location, coordinates,
+# current_sim_day and optionally sim_year_days / sim_season_days. Any "id" column is
+# copied to the output.
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from chart_table import load_chart_table
+from legacy_data import get_interpretation_index
+from legacy_scoring import legacy_results
+from main import INPUT_ERRORS, SimNatalChart, describe_input_error, natal_chart_from_inputs
+
+DEFAULT_INPUTS = {'sim_year_days': 28, 'sim_season_days': 7}
+
+
+def read_rows(path, input_format=None):
+    # Yields one dict per Sim without reading the whole file into memory; a JSONL line that
+    # doesn't parse, or a CSV line with more fields than the header, is yielded as a
+    # ValueError, so it becomes that row's error record
+    input_format = input_format or ('csv' if path.endswith('.csv') else 'jsonl')
+    with open(path, newline='') as file:
+        if input_format == 'csv':
+            for row in csv.DictReader(file):
+                if None in row:
+                    # DictReader puts the fields beyond the header in a list under the key None
+                    yield ValueError(f"{len(row[None])} more field(s) than the header")
+                else:
+                    yield row
+        else:
+            for line in file:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as error:
+                        yield ValueError(f"Invalid JSON: {error}")
+
+
+def init_worker():
+    # Each worker parses the workbook (and loads the chart table) once, not once per row
+    get_interpretation_index()
+    SimNatalChart.CHART_TABLE = load_chart_table()
+
+
+def process_chunk(numbered_rows):
+    # Charts for the whole chunk come from one vectorised ephemeris pass and are scored together
+    results, natal_charts, charted = [], [], []
+    for row_number, row in numbered_rows:
+        result = {"row": row_number}
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            if "id" in row:
+                result["id"] = row["id"]
+            inputs = dict(DEFAULT_INPUTS, **{key: value for key, value in row.items() if value not in (None, '')})
+            natal_charts.append(natal_chart_from_inputs(inputs))
+            charted.append(result)
+        except INPUT_ERRORS as error:
+            result["error"] = describe_input_error(error)
+        results.append(result)
+    for result, legacy in zip(charted, legacy_results(SimNatalChart.generate_natal_charts(natal_charts))):
+        result.update(legacy)
+    return [json.dumps(result) for result in results]
+
+
+def run(input_path, output_path, workers, resume_from=0, chunksize=256, input_format=None, progress_every=10000):
+    rows = itertools.islice(enumerate(read_rows(input_path, input_format)), resume_from, None)
+    mode = 'a' if resume_from else 'w'
+    processed = 0
+    start = time.perf_counter()
+
+    with open(output_path, mode) as output, multiprocessing.Pool(workers, initializer=init_worker) as pool:
+        # imap keeps input order, so the output line count is always a valid --resume-from
+        chunks = iter(lambda: list(itertools.islice(rows, chunksize)), [])
+        for lines in pool.imap(process_chunk, chunks):
+            for line in lines:
+                output.write(line + "\n")
+                processed += 1
+                if progress_every and processed % progress_every == 0:
+                    output.flush()
+                    elapsed = time.perf_counter() - start
+                    print(f"{resume_from + processed} rows, {processed / elapsed:.0f} rows/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed else 0.0
+    print(f"Processed {processed} rows in {elapsed:.1f}s ({rate:.0f} rows/s); next --resume-from {resume_from + processed}",
+          file=sys.stderr)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate legacy challenges for a CSV/JSONL file of Sims')
+    parser.add_argument('input', help='CSV or JSONL file of Sims')
+    parser.add_argument('output', help='JSONL file to write results to')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='input format (default: from the file extension)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=256, help='rows handed to a worker (and scored) at a time')
+    parser.add_argument('--resume-from', type=int, default=0, metavar='N',
+                        help='skip the first N input rows and append to the output')
+    parser.add_argument('--progress-every', type=int, default=10000, metavar='N',
+                        help='report throughput every N rows (0 disables)')
+    args = parser.parse_args()
+
+    run(args.input, args.output, args.workers, args.resume_from, args.chunksize, args.format, args.progress_every)
+
+
+if __name__ == '__main__':
+    main()
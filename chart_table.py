@@ -0,0 +1,128 @@
+#preshypily@gmail.com
+# Offline chart table: sign/house of every planet for every (birth_year, birth_day_of_year)
+# in a year range, plus the chart angles for every lot latitude of every world.
+#
+#   python chart_table.py --first-year -100 --last-year 500 --sim-year-days 28
+#
+# Planet positions depend only on the birth date and the angles only on the latitude,
+# so the table is stored as two factors instead of one row per (date, world).
+import argparse
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from main import NatalChart, SimNatalChart
+from sims4_globe import GLOBE
+
+CHART_TABLE_PATH = 'static/chart_table.npz'
+
+N_PLANETS = len(SimNatalChart.PLANETS)
+
+
+def pack(sign_index, houses):
+    # Sign index in the high nibble, house in the low nibble: one byte per body, as in NatalChart
+    return ((np.asarray(sign_index) << 4) | np.asarray(houses)).astype(np.uint8)
+
+
+def ephemeris_fingerprint():
+    # Tables built from different orbital elements or epoch are rejected on load
+    digest = hashlib.sha1(SimNatalChart.ORBITAL_ELEMENTS.tobytes())
+    digest.update(repr(SimNatalChart.JD_YEAR_ONE).encode())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def angle_codes(latitude):
+    longitudes = SimNatalChart.batch_planetary_positions([SimNatalChart.JD_YEAR_ONE], [latitude])
+    signs, houses = SimNatalChart.batch_signs_and_houses(longitudes[0, N_PLANETS:])
+    return tuple(pack(signs, houses).tolist())
+
+
+class ChartTable:
+    def __init__(self, first_year, planets, latitudes, angles):
+        self.first_year = first_year
+        self.planets = planets
+        self.angles = {float(latitude): tuple(codes) for latitude, codes in zip(latitudes.tolist(), angles.tolist())}
+
+    @property
+    def year_range(self):
+        return self.first_year, self.first_year + self.planets.shape[0] - 1
+
+    @property
+    def sim_year_days(self):
+        return self.planets.shape[1]
+
+    @classmethod
+    def build(cls, first_year, last_year, sim_year_days=28, years_per_chunk=1000):
+        chunks = []
+        for start in range(first_year, last_year + 1, years_per_chunk):
+            years = np.arange(start, min(start + years_per_chunk, last_year + 1))
+            birth_years, birth_days = np.meshgrid(years, np.arange(sim_year_days), indexing='ij')
+            jds = SimNatalChart.batch_julian_dates(birth_years.ravel(), birth_days.ravel())
+            longitudes = SimNatalChart.batch_planetary_positions(jds, 0.0)[:, :N_PLANETS]
+            signs, houses = SimNatalChart.batch_signs_and_houses(longitudes)
+            chunks.append(pack(signs, houses).reshape(len(years), sim_year_days, N_PLANETS))
+
+        # Every latitude a lot can resolve to, world centres included
+        latitudes = np.unique(GLOBE.latitudes)
+        angles = np.array([angle_codes(latitude) for latitude in latitudes.tolist()], dtype=np.uint8)
+        return cls(first_year, np.concatenate(chunks), latitudes, angles)
+
+    def save(self, path=CHART_TABLE_PATH):
+        latitudes = np.array(list(self.angles), dtype=float)
+        np.savez_compressed(
+            path,
+            first_year=self.first_year,
+            planets=self.planets,
+            latitudes=latitudes,
+            angles=np.array(list(self.angles.values()), dtype=np.uint8),
+            fingerprint=ephemeris_fingerprint()
+        )
+
+    @classmethod
+    def load(cls, path=CHART_TABLE_PATH):
+        # None when the file is unreadable, incomplete or built from different orbital elements
+        try:
+            with np.load(path) as data:
+                if str(data['fingerprint']) != ephemeris_fingerprint():
+                    return None
+                return cls(int(data['first_year']), data['planets'], data['latitudes'], data['angles'])
+        except Exception:
+            return None
+
+    def lookup(self, birthdate, latitude):
+        # Same NatalChart as assign_to_zodiac_and_houses, or None when outside the precomputed range
+        year, day_of_year = birthdate
+        row = year - self.first_year
+        if not (0 <= row < self.planets.shape[0] and 0 <= day_of_year < self.planets.shape[1]):
+            return None
+
+        return NatalChart(self.planets[row, day_of_year].tobytes() + bytes(self.angles.get(latitude) or angle_codes(latitude)))
+
+
+def load_chart_table(path=CHART_TABLE_PATH):
+    # None when the table has not been built, is corrupt or was built from different orbital elements
+    if not os.path.exists(path):
+        return None
+    return ChartTable.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute natal chart placements for a range of Sim years')
+    parser.add_argument('--first-year', type=int, default=-100)
+    parser.add_argument('--last-year', type=int, default=500)
+    parser.add_argument('--sim-year-days', type=int, default=28)
+    parser.add_argument('--output', default=CHART_TABLE_PATH)
+    args = parser.parse_args()
+
+    table = ChartTable.build(args.first_year, args.last_year, args.sim_year_days)
+    table.save(args.output)
+    first_year, last_year = table.year_range
+    print(f"Wrote {args.output}: years {first_year}..{last_year}, {table.sim_year_days} days/year, "
+          f"{len(table.angles)} lot latitudes, {table.planets.nbytes} bytes of planet placements")
+
+
+if __name__ == '__main__':
+    main()
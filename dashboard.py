@@ -0,0 +1,68 @@
+#preshypily@gmail.com
+# The Dash app behind the /dashboard/ iframe. Dash (and with it plotly) is only imported when
+# the first dashboard request arrives, so the web app and the CLIs start without it.
+import threading
+from urllib.parse import parse_qs
+
+from main import NatalChart
+from natal_figure import create_natal_chart
+
+DASHBOARD_PREFIX = '/dashboard'
+
+
+def create_dashboard(chart_store):
+    from dash import Dash, dcc, html, Input, Output
+    from flask import Flask
+    import plotly.graph_objs as go
+
+    # Mounted under DASHBOARD_PREFIX, so Dash routes from / while the browser asks for /dashboard/
+    dash_app = Dash(
+        __name__, server=Flask(__name__),
+        requests_pathname_prefix=DASHBOARD_PREFIX + '/', routes_pathname_prefix='/')
+
+    # Define the Dash app's layout (includes the chart); the chart token comes from the iframe URL
+    dash_app.layout = html.Div([
+        dcc.Location(id='url', refresh=False),
+        dcc.Graph(id='natal-chart'),
+    ])
+
+    @dash_app.callback(
+        Output('natal-chart', 'figure'),
+        Input('url', 'search')
+    )
+
+    def update_chart(search):
+        token = parse_qs((search or '').lstrip('?')).get('chart', [''])[0]
+        if not token:
+            return go.Figure()
+        figure = chart_store.get(token)
+        if figure is None:
+            # Expired, evicted or rendered by another worker: the token carries the whole chart
+            try:
+                natal_chart = NatalChart.from_token(token)
+            except ValueError:
+                return go.Figure()
+            figure = create_natal_chart(natal_chart)
+            chart_store.put(token, figure)
+        return figure
+
+    return dash_app
+
+
+class LazyDashboard:
+    """WSGI app that builds the Dash app on its first request and forwards to it from then on."""
+
+    def __init__(self, chart_store):
+        self.chart_store = chart_store
+        self.dash_app = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.dash_app is None:
+            with self._lock:
+                if self.dash_app is None:
+                    self.dash_app = create_dashboard(self.chart_store)
+        return self.dash_app
+
+    def __call__(self, environ, start_response):
+        return self.load().server(environ, start_response)
@@ -0,0 +1,33 @@
+#preshypily@gmail.com
+# gunicorn settings, picked up by `gunicorn app:app` from this directory (see Procfile).
+#
+# By default the app is preloaded: the master imports it and warms it once (the interpretation
+# index, chart table, lot index, scoring arrays, rarity table, figure template and Dash app), then
+# forks the workers, which share all of it copy-on-write instead of each building its own copy.
+# The numpy arrays are never written after they are built, so their pages stay shared for the
+# life of the workers, and gc.freeze keeps the collector from touching the preloaded objects.
+# GUNICORN_PRELOAD=0 makes every worker import the app itself, as before.
+import gc
+import os
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+if preload_app:
+    # Read by app.py at import: the master must not start threads that a fork would lose
+    os.environ['LEGACY_PRELOADED'] = '1'
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported and before the first fork
+    if preload_app:
+        import app
+        app.warm()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import app
+        app.start_background_threads()
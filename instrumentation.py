@@ -0,0 +1,119 @@
+#preshypily@gmail.com
+# Hot-path timing spans aggregated into latency histograms, rendered in the Prometheus
+# text format by /metrics. Set LEGACY_METRICS=0 to turn spans into a shared no-op.
+import bisect
+import functools
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('LEGACY_METRICS', '1') != '0'
+
+# Upper bounds in seconds, from cached lookups up to a cold workbook parse
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[position] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _Span:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def stage_histogram(stage):
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(stage, Histogram())
+    return histogram
+
+
+def span(stage):
+    # with span("aggregation"): ... records the block's wall time under that stage
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(stage_histogram(stage))
+
+
+def timed(stage):
+    # Decorator form of span for whole functions; returns func untouched when metrics are disabled
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(counters=()):
+    # counters: iterable of (metric name, help text, type, value) for extra gauges/counters
+    lines = [
+        "# HELP legacy_stage_duration_seconds Time spent in each stage of the chart-to-legacy pipeline.",
+        "# TYPE legacy_stage_duration_seconds histogram",
+    ]
+    for stage in sorted(_histograms):
+        counts, total, count = _histograms[stage].snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'legacy_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'legacy_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'legacy_stage_duration_seconds_sum{{stage="{stage}"}} {total!r}')
+        lines.append(f'legacy_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+    for name, help_text, metric_type, value in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,198 @@
+#preshypily@gmail.com
+# Inverse search: which birth days and worlds give a Sim the requested traits, aspirations,
+# careers, skills or rules?
+#
+#   python inverse_search.py --trait Perfectionist --career Astronaut --first-year 0 --last-year 100
+#
+# Every placement that produces a requested item is turned into a (body, sign) mask. Planet
+# signs for the whole birth-date range come from one vectorised ephemeris pass and the four
+# chart angles depend only on the world latitude, so scoring the domain is a handful of
+# gathers over (dates x worlds).
+import argparse
+import json
+
+import numpy as np
+
+from legacy_data import CATEGORIES, get_interpretation_index
+from legacy_scoring import filter_natal_charts
+from main import NatalChart, SimNatalChart, format_birthdate
+from sims4_globe import GLOBE
+
+N_PLANETS = len(SimNatalChart.PLANETS)
+
+
+class InverseSearch:
+    def __init__(self, index=None, globe=None):
+        # Without a fixed index every search uses the current (possibly reloaded) workbook snapshot
+        self._index = index
+        self.globe = globe or GLOBE
+        # filter_natal_chart matches bodies by planet.title(), so the search must too
+        self.body_keys = [body.title() for body in SimNatalChart.BODIES]
+        self._lowercase = (None, None)
+
+    @property
+    def index(self):
+        return self._index if self._index is not None else get_interpretation_index()
+
+    def _lowercase_tokens(self, index):
+        # {category: {lowercased token: token}} for index, rebuilt when the snapshot changes
+        lowercase_index, lowercase = self._lowercase
+        if lowercase_index is not index:
+            lowercase = {
+                category: {token.lower(): token for token in tokens}
+                for category, tokens in index.inverted_index().items()
+            }
+            self._lowercase = (index, lowercase)
+        return lowercase
+
+    def resolve(self, category, item, index=None):
+        # Case-insensitive lookup of a requested item in the workbook vocabulary
+        lowercase = self._lowercase_tokens(index or self.index)
+        if category not in lowercase:
+            raise ValueError(f"Unknown category '{category}', expected one of {', '.join(CATEGORIES)}")
+        if not isinstance(item, str):
+            raise ValueError(f"Expected {category} items to be strings, got {item!r}")
+        token = lowercase[category].get(item.strip().lower())
+        if token is None:
+            raise ValueError(f"No placement gives {category} '{item}'")
+        return token
+
+    def placement_mask(self, category, token, index=None):
+        # mask[body, sign_index] is True when that body in that sign (and its house) yields the token
+        mask = np.zeros((len(SimNatalChart.BODIES), 12), dtype=bool)
+        for planet, zodiac, house in (index or self.index).inverted_index()[category].get(token, ()):
+            if zodiac not in SimNatalChart.ZODIAC_SIGNS:
+                continue
+            sign_index = SimNatalChart.ZODIAC_SIGNS.index(zodiac)
+            if house != (sign_index + 1) % 12 + 1:
+                continue  # a chart can never hold this sign/house combination
+            for body, key in enumerate(self.body_keys):
+                if key == planet:
+                    mask[body, sign_index] = True
+        return mask
+
+    def search(self, requested, first_year, last_year, sim_year_days=28, worlds=None, limit=20,
+               current_sim_day=None, verify=True):
+        """Rank (birth year, birth day, world) by how many requested items their charts hit.
+
+        requested maps a category from CATEGORIES to a list of items. A hit means the item
+        appears in a matched workbook row; with verify=True the top results are re-run
+        through CreateLegacyChallenge and "confirmed" lists the items that survive the
+        top-6 aspiration/career and top-20 rule cut-offs.
+        """
+        index = self.index
+        items = [
+            (category, self.resolve(category, item, index))
+            for category, values in requested.items()
+            for item in ([values] if isinstance(values, str) else values)
+        ]
+        if not items:
+            raise ValueError("Nothing to search for")
+        masks = [self.placement_mask(category, token, index) for category, token in items]
+        for (category, token), mask in zip(items, masks):
+            if not mask.any():
+                # Every placement giving it has a house no generated chart pairs with that sign
+                raise ValueError(f"No natal chart can give {category} '{token}'")
+        worlds = list(worlds or self.globe.world_locations)
+        latitudes = [self.globe.get_location(world, 0.0, 0.0, 0.0)['latitude'] for world in worlds]
+
+        birth_years, birth_days = np.meshgrid(
+            np.arange(first_year, last_year + 1), np.arange(sim_year_days), indexing='ij')
+        birth_years, birth_days = birth_years.ravel(), birth_days.ravel()
+        if current_sim_day is not None:
+            # Only Sims already born by current_sim_day
+            born = birth_years * sim_year_days + birth_days <= current_sim_day
+            birth_years, birth_days = birth_years[born], birth_days[born]
+
+        planet_signs, _ = SimNatalChart.batch_signs_and_houses(SimNatalChart.batch_planetary_positions(
+            SimNatalChart.batch_julian_dates(birth_years, birth_days), 0.0)[:, :N_PLANETS])
+        angle_signs, _ = SimNatalChart.batch_signs_and_houses(SimNatalChart.batch_planetary_positions(
+            np.zeros(len(worlds)), latitudes)[:, N_PLANETS:])
+
+        planet_rows = np.arange(N_PLANETS)
+        angle_rows = np.arange(N_PLANETS, len(SimNatalChart.BODIES))
+        hits = []
+        for mask in masks:
+            date_hits = mask[planet_rows, planet_signs].any(axis=1)
+            world_hits = mask[angle_rows, angle_signs].any(axis=1)
+            hits.append(date_hits[:, None] | world_hits[None, :])
+        scores = np.sum(hits, axis=0)
+
+        flat_scores = scores.ravel()
+        candidates = np.flatnonzero(flat_scores)
+        # Highest score first, earliest birth date and world order breaking ties
+        ranked = candidates[np.lexsort((candidates, -flat_scores[candidates]))][:limit]
+
+        ranked = ranked.tolist()
+        if verify:
+            # The top results' full legacy challenges, scored as one batch
+            legacies = filter_natal_charts([
+                self.chart(planet_signs[flat // len(worlds)], angle_signs[flat % len(worlds)]) for flat in ranked
+            ], index)
+
+        results = []
+        for number, flat in enumerate(ranked):
+            date, world = divmod(flat, len(worlds))
+            birthdate = (int(birth_years[date]), int(birth_days[date]))
+            result = {
+                "birth_year": birthdate[0],
+                "birth_day_of_year": birthdate[1],
+                "formatted_birthdate": format_birthdate(birthdate, max(1, sim_year_days // 4)),
+                "world": worlds[world],
+                "score": int(flat_scores[flat]),
+                "matched": [token for (_, token), item_hits in zip(items, hits) if item_hits[date, world]],
+            }
+            if current_sim_day is not None:
+                result["sim_age"] = current_sim_day - (birthdate[0] * sim_year_days + birthdate[1])
+            if verify:
+                result["confirmed"] = self.confirmed_items(legacies[number], items)
+            results.append(result)
+        return results
+
+    @staticmethod
+    def chart(planet_signs, angle_signs):
+        return NatalChart.from_signs(planet_signs.tolist() + angle_signs.tolist())
+
+    @staticmethod
+    def confirmed_items(legacy, items):
+        # legacy is the chart's filter_natal_chart() result
+        traits, aspirations, careers, best_skills, worst_skills, rules = legacy
+        final = {
+            'traits': set(traits),
+            'aspirations': set(aspirations),
+            'careers': set(careers),
+            'best_skills': {skill.rsplit(' (', 1)[0] for skill in best_skills},
+            'worst_skills': {skill.rsplit(' (', 1)[0] for skill in worst_skills},
+            'rules': set(rules),
+        }
+        return [token for category, token in items if token in final[category]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find birth days and worlds that give the requested legacy items')
+    parser.add_argument('--trait', action='append', default=[])
+    parser.add_argument('--aspiration', action='append', default=[])
+    parser.add_argument('--career', action='append', default=[])
+    parser.add_argument('--best-skill', action='append', default=[])
+    parser.add_argument('--worst-skill', action='append', default=[])
+    parser.add_argument('--rule', action='append', default=[])
+    parser.add_argument('--first-year', type=int, default=0)
+    parser.add_argument('--last-year', type=int, default=100)
+    parser.add_argument('--sim-year-days', type=int, default=28)
+    parser.add_argument('--current-sim-day', type=int, help='also report the Sim age that gives each birth day')
+    parser.add_argument('--world', action='append', help='restrict to these worlds (default: all)')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    requested = {
+        'traits': args.trait, 'aspirations': args.aspiration, 'careers': args.career,
+        'best_skills': args.best_skill, 'worst_skills': args.worst_skill, 'rules': args.rule,
+    }
+    results = InverseSearch().search(
+        requested, args.first_year, args.last_year, args.sim_year_days, args.world, args.limit, args.current_sim_day)
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+#preshypily@gmail.com
+import argparse
+import contextvars
+import hashlib
+import io
+import os
+import threading
+import time
+
+import numpy as np
+
+from instrumentation import span
+
+WORKBOOK_PATH = 'static/natal_planets_houses_allzodiacs.xlsx'
+# Pre-tokenised copy of the workbook (python legacy_data.py), tied to it by workbook_version
+SIDECAR_PATH = 'static/natal_planets_houses_allzodiacs.index.npz'
+SIDECAR_FORMAT = 1
+
+COLUMNS_OF_INTEREST = [
+    'Trait(s)', 'Aspiration(s)', 'Career', 'Best Skill(s)',
+    'Worst Skill(s)', 'Rule(s)'
+]
+
+# One vocabulary per output category, in the same order as COLUMNS_OF_INTEREST
+CATEGORIES = ('traits', 'aspirations', 'careers', 'best_skills', 'worst_skills', 'rules')
+
+SEPARATORS = [',', '.']
+
+
+def clean_split(entry, separators):
+    for sep in separators:
+        entry = entry.split(sep)[0]
+    return entry.strip()
+
+
+def normalise_rule(rule):
+    if "Must master" in rule:
+        rule_parts = rule.split(" and ")
+        for part in rule_parts:
+            part_cleaned = part.replace("Must master", "").strip().capitalize()
+            rule_cleaned = f"Must master {part_cleaned}"
+    else:
+        rule_parts = rule.split(", ")
+        for part in rule_parts:
+            part_cleaned = part.capitalize().strip()
+            if part_cleaned.startswith("And "):
+                part_cleaned = part_cleaned[4:]
+            rule_cleaned = part_cleaned
+    return rule_cleaned
+
+
+def tokenize_row(row):
+    # The exact tokens filter_natal_chart used to count for one workbook row
+    return (
+        [clean_split(trait, SEPARATORS) for trait in row['Trait(s)'].split(', ')],
+        row['Aspiration(s)'].split(', '),
+        row['Career'].split(', '),
+        [clean_split(skill, SEPARATORS) for skill in row['Best Skill(s)'].split(', ')],
+        [clean_split(skill, SEPARATORS) for skill in row['Worst Skill(s)'].split(', ')],
+        [normalise_rule(rule) for rule in row['Rule(s)'].split('. ')],
+    )
+
+
+class InterpretationIndex:
+    """Pre-tokenized interpretation workbook keyed by (Planet, Zodiac, House).
+
+    Each row is stored as a record of token-id tuples, one per category, that
+    index into the per-category vocabularies. Request-time aggregation only
+    has to count ids.
+    """
+
+    def __init__(self, placements, records, vocabularies, version=None):
+        self.placements = placements
+        self.records = records
+        self.vocabularies = vocabularies
+        # Content hash of the workbook this index was built from (see workbook_version)
+        self.version = version
+        # 'workbook' or 'sidecar': which file the index was actually read from
+        self.source = None
+        self._inverted = None
+        self._code_rows = {}
+        self._incidence = None
+
+    @classmethod
+    def from_workbook(cls, file_path=WORKBOOK_PATH):
+        with open(file_path, 'rb') as file:
+            return cls.from_workbook_bytes(file.read())
+
+    @classmethod
+    def from_workbook_bytes(cls, data):
+        # Hashing and parsing the same bytes keeps the version honest even if the file changes mid-read.
+        # pandas (and openpyxl) are only imported when there is no usable sidecar.
+        import pandas as pd
+        with span("workbook_parse"):
+            df = pd.read_excel(io.BytesIO(data), engine='openpyxl')
+        with span("workbook_index"):
+            index = cls.from_rows(df[['Planet', 'Zodiac', 'House'] + COLUMNS_OF_INTEREST].itertuples(index=False))
+        index.version = workbook_version(data)
+        index.source = 'workbook'
+        return index
+
+    @classmethod
+    def from_rows(cls, rows):
+        placements, records = {}, []
+        vocabularies = {category: [] for category in CATEGORIES}
+        token_ids = {category: {} for category in CATEGORIES}
+
+        for row in rows:
+            planet, zodiac, house = row[0], row[1], int(row[2])
+            tokens = tokenize_row(dict(zip(COLUMNS_OF_INTEREST, row[3:])))
+            record = []
+            for category, category_tokens in zip(CATEGORIES, tokens):
+                ids = token_ids[category]
+                vocabulary = vocabularies[category]
+                for token in category_tokens:
+                    if token not in ids:
+                        ids[token] = len(vocabulary)
+                        vocabulary.append(token)
+                record.append(tuple(ids[token] for token in category_tokens))
+            placements[(planet, zodiac, house)] = len(records)
+            records.append(tuple(record))
+
+        return cls(placements, records, vocabularies)
+
+    def save_sidecar(self, path=SIDECAR_PATH):
+        # A handful of flat arrays (every npz member costs a zip lookup on load): all strings
+        # as one fixed-width unicode table, per category each distinct token-id tuple once plus,
+        # per row, which tuple it has, and the placements as (planet, zodiac, house, row)
+        # numbers. Loading needs neither openpyxl nor pickle.
+        strings, ids, id_offsets, tuple_bounds, rows = [], [], [0], [0], []
+        vocabulary_bounds = [0]
+        for number, category in enumerate(CATEGORIES):
+            strings.extend(self.vocabularies[category])
+            vocabulary_bounds.append(len(strings))
+            distinct = {}
+            rows.append([distinct.setdefault(record[number], len(distinct)) for record in self.records])
+            for token_ids in distinct:
+                ids.extend(token_ids)
+                id_offsets.append(len(ids))
+            tuple_bounds.append(len(id_offsets) - 1)
+
+        # Planet and zodiac names go in the string table too, after the vocabularies
+        names = {}
+        placements = [
+            (names.setdefault(planet, len(strings) + len(names)), names.setdefault(zodiac, len(strings) + len(names)), house, row_id)
+            for (planet, zodiac, house), row_id in self.placements.items()
+        ]
+        strings.extend(names)
+        arrays = {
+            'format': SIDECAR_FORMAT,
+            'version': self.version or '',
+            'strings': np.array(strings, dtype=str),
+            'vocabulary_bounds': np.array(vocabulary_bounds, dtype=np.int64),
+            'ids': np.array(ids, dtype=np.int32),
+            'id_offsets': np.array(id_offsets, dtype=np.int64),
+            'tuple_bounds': np.array(tuple_bounds, dtype=np.int64),
+            'rows': np.array(rows, dtype=np.int32).reshape(len(CATEGORIES), len(self.records)),
+            'placements': np.array(placements, dtype=np.int64).reshape(-1, 4),
+        }
+
+        # Written next to the target and renamed over it, so a worker never reads half a file
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def from_sidecar(cls, path=SIDECAR_PATH, version=None):
+        # None when the sidecar is missing, unreadable, another format or built from another workbook
+        try:
+            with span("sidecar_load"), np.load(path) as data:
+                if int(data['format']) != SIDECAR_FORMAT or (version is not None and str(data['version']) != version):
+                    return None
+                strings, vocabulary_bounds = data['strings'].tolist(), data['vocabulary_bounds'].tolist()
+                ids, id_offsets = data['ids'].tolist(), data['id_offsets'].tolist()
+                tuple_bounds, rows = data['tuple_bounds'].tolist(), data['rows'].tolist()
+                placement_rows = data['placements'].tolist()
+                stored_version = str(data['version'])
+        except Exception:
+            # Missing, truncated (zipfile.BadZipFile) or otherwise corrupt: fall back to the workbook
+            return None
+
+        distinct = [tuple(ids[start:stop]) for start, stop in zip(id_offsets[:-1], id_offsets[1:])]
+        vocabularies, columns = {}, []
+        for number, category in enumerate(CATEGORIES):
+            vocabularies[category] = strings[vocabulary_bounds[number]:vocabulary_bounds[number + 1]]
+            category_tuples = distinct[tuple_bounds[number]:tuple_bounds[number + 1]]
+            columns.append([category_tuples[tuple_number] for tuple_number in rows[number]])
+        placements = {(strings[planet], strings[zodiac], house): row_id for planet, zodiac, house, row_id in placement_rows}
+
+        index = cls(placements, list(zip(*columns)), vocabularies, stored_version or None)
+        index.source = 'sidecar'
+        return index
+
+    def lookup(self, planet, zodiac, house):
+        return self.placements.get((planet, zodiac, house))
+
+    def code_rows(self, bodies, zodiac_signs):
+        # rows[body_index][sign_index << 4 | house] -> row id or None, the lookup() of every
+        # placement in the compact chart encoding, keyed like filter_natal_chart (body.title())
+        key = (tuple(bodies), tuple(zodiac_signs))
+        rows = self._code_rows.get(key)
+        if rows is None:
+            rows = [
+                [self.lookup(body.title(), zodiac_signs[(code >> 4) % 12], code & 0x0F) for code in range(256)]
+                for body in bodies
+            ]
+            self._code_rows[key] = rows
+        return rows
+
+    def incidence_matrix(self):
+        # The workbook as a sparse (row x token) matrix in CSR form: the token columns of row r are
+        # columns[indptr[r]:indptr[r + 1]], in the order count_tokens walks them, and the columns
+        # of each category start at offsets[category number]
+        if self._incidence is None:
+            offsets = np.cumsum([0] + [len(self.vocabularies[category]) for category in CATEGORIES])
+            columns = [
+                offset + token_id
+                for record in self.records
+                for offset, ids in zip(offsets.tolist(), record)
+                for token_id in ids
+            ]
+            lengths = [sum(len(ids) for ids in record) for record in self.records]
+            indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            self._incidence = (indptr, np.array(columns, dtype=np.int64), offsets)
+        return self._incidence
+
+    def count_tokens(self, row_ids):
+        # Returns {category: {token: count}} with tokens in first-seen order
+        counts = [{} for _ in CATEGORIES]
+        for row_id in row_ids:
+            for category_counts, ids in zip(counts, self.records[row_id]):
+                for token_id in ids:
+                    category_counts[token_id] = category_counts.get(token_id, 0) + 1
+
+        return {
+            category: {self.vocabularies[category][token_id]: count for token_id, count in category_counts.items()}
+            for category, category_counts in zip(CATEGORIES, counts)
+        }
+
+    def inverted_index(self):
+        # {category: {token: [(Planet, Zodiac, House), ...]}}: every placement whose row yields the token
+        if self._inverted is None:
+            inverted = {category: {} for category in CATEGORIES}
+            for placement, row_id in self.placements.items():
+                for category, ids in zip(CATEGORIES, self.records[row_id]):
+                    vocabulary = self.vocabularies[category]
+                    for token_id in dict.fromkeys(ids):
+                        inverted[category].setdefault(vocabulary[token_id], []).append(placement)
+            self._inverted = inverted
+        return self._inverted
+
+    def __len__(self):
+        return len(self.records)
+
+
+def workbook_version(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def load_interpretation_index(data, sidecar_path=SIDECAR_PATH):
+    # The sidecar when it was built from exactly these workbook bytes, else parse the workbook
+    index = InterpretationIndex.from_sidecar(sidecar_path, workbook_version(data)) if sidecar_path else None
+    if index is None:
+        index = InterpretationIndex.from_workbook_bytes(data)
+    return index
+
+
+class DataRegistry:
+    """Versioned InterpretationIndex snapshots of the workbook, reloaded when it changes.
+
+    index is always a complete snapshot. A changed workbook is parsed off to the side and
+    swapped in with a single assignment, so requests holding the previous snapshot finish
+    with it. Listeners are called with (previous, current) after every swap.
+    """
+
+    def __init__(self, file_path=WORKBOOK_PATH, sidecar_path=SIDECAR_PATH):
+        self.file_path = file_path
+        self.sidecar_path = sidecar_path
+        self.reloads = 0
+        self.loaded_at = None
+        self.last_error = None
+        self._index = None
+        self._stat = None
+        self._failed_version = None
+        self._listeners = []
+        # Serialises loads; readers of an already loaded index never take it
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._stat = self._file_stat()
+                    with open(self.file_path, 'rb') as file:
+                        self._swap(load_interpretation_index(file.read(), self.sidecar_path))
+        return self._index
+
+    def _file_stat(self):
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _swap(self, index):
+        self._index = index
+        self.loaded_at = time.time()
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def check(self):
+        # Reload if the workbook changed; True when a new snapshot was swapped in
+        with self._lock:
+            try:
+                stat = self._file_stat()
+                if stat == self._stat:
+                    return False
+                with open(self.file_path, 'rb') as file:
+                    data = file.read()
+            except OSError as error:
+                self.last_error = str(error)
+                return False
+            self._stat = stat
+
+            # A touched but unchanged file, or one that already failed to parse, is not rebuilt
+            version = workbook_version(data)
+            if version in (getattr(self._index, 'version', None), self._failed_version):
+                return False
+            try:
+                index = load_interpretation_index(data, self.sidecar_path)
+            except Exception as error:
+                # Typically a workbook caught half-saved; keep serving the current snapshot
+                self._failed_version = version
+                self.last_error = f"{type(error).__name__}: {error}"
+                return False
+
+            previous = self._index
+            self._swap(index)
+            self.reloads += 1
+            self.last_error = None
+
+        for listener in self._listeners:
+            listener(previous, index)
+        return True
+
+    def start(self, interval):
+        # Poll the workbook every interval seconds on a daemon thread (interval <= 0 disables)
+        if interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, args=(interval,), name='workbook-watcher', daemon=True)
+            self._thread.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "path": self.file_path,
+            "version": getattr(self._index, 'version', None),
+            "source": getattr(self._index, 'source', None),
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "watching": self._thread is not None,
+            "last_error": self.last_error
+        }
+
+
+DATA_REGISTRY = DataRegistry()
+
+# Snapshot pinned for the current request (or task), so it sees one data version throughout
+_pinned_index = contextvars.ContextVar('pinned_index', default=None)
+
+
+def get_interpretation_index():
+    # The pinned snapshot if there is one, else the registry's current one (parsed on first use)
+    index = _pinned_index.get()
+    if index is None:
+        index = DATA_REGISTRY.index
+    return index
+
+
+def pin_interpretation_index():
+    # Pins the current snapshot for this context; pass the returned token to unpin_interpretation_index
+    return _pinned_index.set(DATA_REGISTRY.index)
+
+
+def unpin_interpretation_index(token):
+    _pinned_index.reset(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the binary sidecar the interpretation index loads from')
+    parser.add_argument('--workbook', default=WORKBOOK_PATH)
+    parser.add_argument('--output', default=SIDECAR_PATH)
+    args = parser.parse_args()
+
+    index = InterpretationIndex.from_workbook(args.workbook)
+    index.save_sidecar(args.output)
+    print(f"Wrote {args.output}: {len(index)} rows, {len(index.placements)} placements, workbook version {index.version}")
+
+
+if __name__ == '__main__':
+    main()
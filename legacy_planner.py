@@ -0,0 +1,229 @@
+#preshypily@gmail.com
+# Multi-generation legacy planner: every heir of one or many household timelines charted and
+# turned into a legacy challenge in a single pass.
+#
+#   python legacy_planner.py --world "Willow Creek" --current-sim-day 5000 --heirs -4000 -2600 -1200 0
+#
+# Heir birth days are relative to current_sim_day (-300 is a Sim born 300 days ago, i.e. aged
+# 300). With a fixed household world the chart angles never change and the outer bodies move a
+# few degrees per Sim year, so the aggregation is split in two: the slow placements are summed
+# once per distinct combination and reused, and only the fast planets are re-aggregated per heir.
+import argparse
+import json
+
+import numpy as np
+
+from legacy_data import CATEGORIES, get_interpretation_index
+from main import SimNatalChart, format_birthdate, parse_coordinates
+from result_cache import DEFAULT_RESULT_CACHE_SIZE, LRUCache
+from sims4_globe import GLOBE
+
+N_BODIES = len(SimNatalChart.BODIES)
+N_PLANETS = len(SimNatalChart.PLANETS)
+# Planets whose mean longitude moves less than 0.02 degrees a day (Uranus out to Vertex), plus
+# the angles, which only depend on the birth world
+SLOW_BODIES = np.array(
+    [body for body in range(N_PLANETS) if SimNatalChart.ORBITAL_ELEMENTS[body, 2] < 0.02]
+    + list(range(N_PLANETS, N_BODIES))
+)
+FAST_BODIES = np.setdiff1d(np.arange(N_BODIES), SLOW_BODIES)
+# rank values above this mean "token not in the chart"
+NOT_SEEN = np.iinfo(np.int32).max
+
+
+class PlacementTables:
+    """Dense per-(body, sign) token counts and first-seen ranks for the whole workbook.
+
+    A generated chart's house always follows its sign, so a chart is fully described by one
+    sign index per body. counts[body, sign] is the token count vector of the workbook row for
+    that placement and ranks[body, sign] the position each token is first seen at, ordered
+    the way count_tokens walks the chart. Token vectors are all categories back to back,
+    starting at self.offsets.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.vocabularies = [index.vocabularies[category] for category in CATEGORIES]
+        offsets = np.cumsum([0] + [len(vocabulary) for vocabulary in self.vocabularies])
+        self.offsets = offsets.tolist()
+        width = max(len(ids) for record in index.records for ids in record) + 1
+
+        self.counts = np.zeros((N_BODIES, 12, offsets[-1]), dtype=np.int32)
+        self.ranks = np.full((N_BODIES, 12, offsets[-1]), NOT_SEEN, dtype=np.int32)
+        for body, name in enumerate(SimNatalChart.BODIES):
+            for sign_index, zodiac in enumerate(SimNatalChart.ZODIAC_SIGNS):
+                # Same key aggregate_natal_chart looks rows up by, North_Node quirk included
+                row_id = index.lookup(name.title(), zodiac, (sign_index + 1) % 12 + 1)
+                if row_id is None:
+                    continue
+                for offset, ids in zip(offsets, index.records[row_id]):
+                    for position, token_id in enumerate(ids):
+                        column = offset + token_id
+                        self.counts[body, sign_index, column] += 1
+                        self.ranks[body, sign_index, column] = min(
+                            self.ranks[body, sign_index, column], body * width + position)
+
+    def aggregate(self, sign_indexes, bodies):
+        # Summed counts and first-seen ranks of the given bodies for each row of sign_indexes
+        counts = self.counts[bodies, sign_indexes].sum(axis=1)
+        ranks = self.ranks[bodies, sign_indexes].min(axis=1)
+        return counts, ranks
+
+    def legacy(self, counts, ranks):
+        # The six results of CreateLegacyChallenge.aggregate_natal_chart from one chart's vectors
+        present = np.flatnonzero(counts)
+        bounds = np.searchsorted(present, self.offsets).tolist()
+        columns, present_counts, present_ranks = present.tolist(), counts[present].tolist(), ranks[present].tolist()
+
+        results = []
+        for number, (category, vocabulary) in enumerate(zip(CATEGORIES, self.vocabularies)):
+            start, stop, offset = bounds[number], bounds[number + 1], self.offsets[number]
+            # (token, count) in the order count_tokens first sees them; ranks are unique per category
+            first_seen = [
+                (vocabulary[column - offset], count)
+                for _, column, count in sorted(zip(present_ranks[start:stop], columns[start:stop], present_counts[start:stop]))
+            ]
+            # Most frequent first, ties in first-seen order, like the stable reverse sort
+            by_count = sorted(first_seen, key=lambda token_count: -token_count[1])
+            if category == 'traits':
+                results.append(sorted(token for token, _ in first_seen))
+            elif category in ('aspirations', 'careers'):
+                results.append([token for token, _ in by_count[:6]])
+            elif category == 'rules':
+                results.append(sorted(token for token, _ in by_count[:20]))
+            elif category == 'best_skills':
+                results.append({f"{token} (+{count + 1})": count for token, count in first_seen})
+            else:
+                results.append({f"{token} (-{count})": count for token, count in first_seen})
+        return tuple(results)
+
+
+class GenerationPlanner:
+    def __init__(self, index=None, globe=None, cache_size=DEFAULT_RESULT_CACHE_SIZE):
+        # Without a fixed index the planner follows the current (possibly reloaded) workbook snapshot
+        self._index = index
+        self.globe = globe or GLOBE
+        self.cache_size = cache_size
+        self._state = None
+        self._snapshot()
+
+    def _snapshot(self):
+        # (index, tables, slow partials, legacies), replaced as a whole when the workbook changes so
+        # nothing aggregated from one version is reused for another. The caches hold aggregated
+        # slow placements and finished legacies by sign bytes, shared across plans.
+        index = self._index if self._index is not None else get_interpretation_index()
+        state = self._state
+        if state is None or state[0] is not index:
+            state = (index, PlacementTables(index), LRUCache(self.cache_size), LRUCache(self.cache_size))
+            self._state = state
+        return state
+
+    @property
+    def tables(self):
+        return self._snapshot()[1]
+
+    def plan(self, timeline, current_sim_day, sim_year_days=28, sim_season_days=7):
+        return self.plan_many([timeline], current_sim_day, sim_year_days, sim_season_days)[0]
+
+    def plan_many(self, timelines, current_sim_day, sim_year_days=28, sim_season_days=7):
+        """Chart and legacy challenge for every heir of every timeline.
+
+        A timeline is {"birth_location": world, "heirs": [...]} where each heir is a birth day
+        relative to current_sim_day or a dict with "birth_day" and optionally its own
+        "birth_location" and "coordinates" (in-game x,y,z, the world's centre lot by default).
+        Returns one list of legacy_result-style dicts per timeline.
+        """
+        if sim_year_days <= 0 or sim_season_days <= 0:
+            raise ValueError("sim_year_days and sim_season_days must be positive")
+        heirs = []
+        for timeline_number, timeline in enumerate(timelines):
+            for generation, heir in enumerate(timeline['heirs']):
+                if not isinstance(heir, dict):
+                    heir = {'birth_day': heir}
+                world = heir.get('birth_location', timeline.get('birth_location'))
+                x, _, z = parse_coordinates(heir.get('coordinates', timeline.get('coordinates')))
+                heirs.append((timeline_number, generation, int(heir['birth_day']), world, x, z))
+        if not heirs:
+            return [[] for _ in timelines]
+        latitudes, _ = self.globe.locate([heir[3] for heir in heirs], [heir[4] for heir in heirs], [heir[5] for heir in heirs])
+
+        # Same birthdate SimNatalChart.calculate_birthdate derives from sim_age = -birth_day
+        birth_years, birth_days = np.divmod(current_sim_day + np.array([heir[2] for heir in heirs]), sim_year_days)
+        longitudes = SimNatalChart.batch_planetary_positions(
+            SimNatalChart.batch_julian_dates(birth_years, birth_days), latitudes)
+        sign_indexes, _ = SimNatalChart.batch_signs_and_houses(longitudes)
+        sign_indexes = sign_indexes.astype(np.uint8)
+
+        legacies = self._legacy_for(sign_indexes, self._snapshot())
+
+        plans = [[] for _ in timelines]
+        for (timeline_number, generation, birth_day, world, _, _), signs, birth_year, birth_day_of_year, legacy in zip(
+                heirs, sign_indexes.tolist(), birth_years.tolist(), birth_days.tolist(), legacies):
+            traits, aspirations, careers, best_skills, worst_skills, rules = legacy
+            plans[timeline_number].append({
+                "generation": generation,
+                "birth_day": birth_day,
+                "sim_age": -birth_day,
+                "birth_location": world,
+                "natal_chart": {
+                    body: {"sign": SimNatalChart.ZODIAC_SIGNS[sign_index], "house": (sign_index + 1) % 12 + 1}
+                    for body, sign_index in zip(SimNatalChart.BODIES, signs)
+                },
+                "formatted_birthdate": format_birthdate((birth_year, birth_day_of_year), sim_season_days),
+                "traits": list(traits),
+                "aspirations": list(aspirations),
+                "careers": list(careers),
+                "best_skills": dict(best_skills),
+                "worst_skills": dict(worst_skills),
+                "rules": list(rules),
+            })
+        return plans
+
+    def _legacy_for(self, sign_indexes, state):
+        # Every distinct chart is aggregated once; the slow half comes from the cache when seen before
+        _, tables, slow_cache, legacy_cache = state
+        charts, chart_of_heir = np.unique(sign_indexes, axis=0, return_inverse=True)
+        legacies = [legacy_cache.get(chart.tobytes()) for chart in charts]
+        todo = [number for number, legacy in enumerate(legacies) if legacy is None]
+
+        if todo:
+            slow_partials = {signs.tobytes(): None for signs in charts[todo][:, SLOW_BODIES]}
+            for key in slow_partials:
+                slow_partials[key] = slow_cache.get(key)
+            missing = [key for key, partial in slow_partials.items() if partial is None]
+            if missing:
+                new_signs = np.array([np.frombuffer(key, dtype=np.uint8) for key in missing])
+                for key, counts, ranks in zip(missing, *tables.aggregate(new_signs, SLOW_BODIES)):
+                    slow_partials[key] = (counts, ranks)
+                    slow_cache.put(key, (counts, ranks))
+
+            fast_counts, fast_ranks = tables.aggregate(charts[todo][:, FAST_BODIES], FAST_BODIES)
+            for number, counts, ranks in zip(todo, fast_counts, fast_ranks):
+                slow_counts, slow_ranks = slow_partials[charts[number][SLOW_BODIES].tobytes()]
+                legacies[number] = tables.legacy(counts + slow_counts, np.minimum(ranks, slow_ranks))
+                legacy_cache.put(charts[number].tobytes(), legacies[number])
+
+        return [legacies[number] for number in np.ravel(chart_of_heir).tolist()]
+
+    def clear(self):
+        self._state = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chart and legacy challenge for every heir of a household')
+    parser.add_argument('--world', required=True, help='household world, e.g. "Willow Creek"')
+    parser.add_argument('--current-sim-day', type=int, required=True)
+    parser.add_argument('--heirs', type=int, nargs='+', required=True,
+                        help='heir birth days relative to the current Sim day (negative = already born)')
+    parser.add_argument('--sim-year-days', type=int, default=28)
+    parser.add_argument('--sim-season-days', type=int, default=7)
+    args = parser.parse_args()
+
+    plan = GenerationPlanner().plan(
+        {'birth_location': args.world, 'heirs': args.heirs}, args.current_sim_day, args.sim_year_days, args.sim_season_days)
+    for heir in plan:
+        print(json.dumps(heir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#preshypily@gmail.com
+# Outcome rarity: the share of all Sims that end up with each trait, aspiration, career,
+# skill and rule, e.g. "Perfectionist: 3.1% of Sims".
+#
+#   python legacy_rarity.py --first-year -100 --last-year 500 --sim-year-days 28
+#
+# The domain is every birth day in the year range, born on every lot of every world. Planet
+# placements depend only on the birth date and the angles only on the lot's latitude, so each
+# distinct planet and angle combination is scored once, weighted by how many (date, lot) pairs
+# share it. The
+# result is tied to the workbook version it was computed from; after a workbook edit the
+# statistics are unavailable until this job is rerun.
+import argparse
+import os
+import threading
+
+import numpy as np
+
+from chart_table import N_PLANETS, angle_codes, pack
+from legacy_data import CATEGORIES, get_interpretation_index
+from legacy_scoring import get_scorer
+from main import SimNatalChart
+from sims4_globe import GLOBE
+
+RARITY_PATH = 'static/legacy_rarity.npz'
+RARITY_FORMAT = 2
+# Charts scored per pass, which bounds the job's memory use
+CHARTS_PER_PASS = 50000
+
+
+def format_share(share):
+    return "<0.1%" if share < 0.001 else f"{share:.1%}"
+
+
+def skill_name(label):
+    # "Baking (+2)" -> "Baking", the way best/worst skills are keyed in the results
+    return label.rsplit(' (', 1)[0]
+
+
+class RarityTable:
+    def __init__(self, version, first_year, last_year, sim_year_days, charts, counts):
+        self.version = version
+        self.first_year = first_year
+        self.last_year = last_year
+        self.sim_year_days = sim_year_days
+        self.charts = charts
+        # {category: {token: number of charts whose result lists it}}
+        self.counts = counts
+
+    @classmethod
+    def build(cls, index, first_year, last_year, sim_year_days=28):
+        scorer = get_scorer(index)
+        birth_years, birth_days = np.meshgrid(np.arange(first_year, last_year + 1), np.arange(sim_year_days), indexing='ij')
+        longitudes = SimNatalChart.batch_planetary_positions(
+            SimNatalChart.batch_julian_dates(birth_years.ravel(), birth_days.ravel()), 0.0)[:, :N_PLANETS]
+        planets, planet_weights = np.unique(pack(*SimNatalChart.batch_signs_and_houses(longitudes)), axis=0, return_counts=True)
+        lot_angles, lots = [], []
+        for world in GLOBE.world_locations:
+            latitudes, lots_per_row = GLOBE.lot_latitudes(world)
+            lot_angles.extend(angle_codes(latitude) for latitude in latitudes.tolist())
+            lots.extend([lots_per_row] * len(latitudes))
+        angles, inverse = np.unique(np.array(lot_angles, dtype=np.uint8), axis=0, return_inverse=True)
+        angle_weights = np.bincount(inverse.ravel(), lots)
+
+        totals = np.zeros(scorer.width)
+        step = max(1, CHARTS_PER_PASS // len(angles))
+        for start in range(0, len(planets), step):
+            block = planets[start:start + step]
+            codes = np.concatenate([np.repeat(block, len(angles), axis=0), np.tile(angles, (len(block), 1))], axis=1)
+            totals += scorer.outcome_counts(codes, np.outer(planet_weights[start:start + step], angle_weights).ravel())
+
+        tokens = scorer.tokens.tolist()
+        counts = {
+            category: {tokens[column]: int(totals[column]) for column in range(start, stop) if totals[column]}
+            for category, start, stop in zip(CATEGORIES, scorer.offsets, scorer.offsets[1:])
+        }
+        return cls(index.version, first_year, last_year, sim_year_days, int(planet_weights.sum() * angle_weights.sum()), counts)
+
+    def save(self, path=RARITY_PATH):
+        tokens, numbers, bounds = [], [], [0]
+        for category in CATEGORIES:
+            tokens.extend(self.counts[category])
+            numbers.extend(self.counts[category].values())
+            bounds.append(len(tokens))
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            np.savez_compressed(
+                file,
+                format=RARITY_FORMAT,
+                version=self.version or '',
+                domain=np.array([self.first_year, self.last_year, self.sim_year_days, self.charts], dtype=np.int64),
+                tokens=np.array(tokens, dtype=str),
+                counts=np.array(numbers, dtype=np.int64),
+                bounds=np.array(bounds, dtype=np.int64)
+            )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path=RARITY_PATH, version=None):
+        # None when the file is missing, unreadable, another format or computed from another workbook
+        try:
+            with np.load(path) as data:
+                if int(data['format']) != RARITY_FORMAT or (version is not None and str(data['version']) != version):
+                    return None
+                first_year, last_year, sim_year_days, charts = data['domain'].tolist()
+                tokens, numbers, bounds = data['tokens'].tolist(), data['counts'].tolist(), data['bounds'].tolist()
+                stored_version = str(data['version'])
+        except Exception:
+            # Missing, truncated (zipfile.BadZipFile) or otherwise corrupt: no rarity shown
+            return None
+        counts = {
+            category: dict(zip(tokens[start:stop], numbers[start:stop]))
+            for category, start, stop in zip(CATEGORIES, bounds, bounds[1:])
+        }
+        return cls(stored_version or None, first_year, last_year, sim_year_days, charts, counts)
+
+    def share(self, category, token):
+        return self.counts[category].get(token, 0) / self.charts
+
+    def annotate(self, category, items):
+        # {displayed item: formatted share} for one category of a filter_natal_chart result
+        return {
+            item: format_share(self.share(category, skill_name(item) if category.endswith('_skills') else item))
+            for item in items
+        }
+
+    def to_dict(self, categories=CATEGORIES):
+        return {
+            "version": self.version,
+            "domain": {"first_year": self.first_year, "last_year": self.last_year, "sim_year_days": self.sim_year_days},
+            "charts": self.charts,
+            "rarity": {
+                category: {token: count / self.charts for token, count in self.counts[category].items()}
+                for category in categories
+            }
+        }
+
+
+_loaded = (None, None)
+_lock = threading.Lock()
+
+
+def get_rarity(index=None, path=RARITY_PATH):
+    # The rarity table for index's workbook version, reread when the file changes; None if not computed
+    global _loaded
+    if index is None:
+        index = get_interpretation_index()
+    try:
+        key = (index.version, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    with _lock:
+        loaded_key, table = _loaded
+        if loaded_key != key:
+            table = RarityTable.load(path, index.version)
+            _loaded = (key, table)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute how rare each legacy outcome is across every birth day and lot')
+    parser.add_argument('--first-year', type=int, default=-100)
+    parser.add_argument('--last-year', type=int, default=500)
+    parser.add_argument('--sim-year-days', type=int, default=28)
+    parser.add_argument('--output', default=RARITY_PATH)
+    args = parser.parse_args()
+
+    index = get_interpretation_index()
+    table = RarityTable.build(index, args.first_year, args.last_year, args.sim_year_days)
+    table.save(args.output)
+    print(f"Wrote {args.output}: {table.charts} charts (years {table.first_year}..{table.last_year}, "
+          f"{table.sim_year_days} days/year, every lot), workbook version {table.version}")
+
+
+if __name__ == '__main__':
+    main()
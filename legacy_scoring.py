@@ -0,0 +1,156 @@
+#preshypily@gmail.com
+# Batch legacy scoring: thousands of compact natal charts turned into legacy challenges at once.
+#
+# The workbook is a sparse (workbook row x token) incidence matrix (InterpretationIndex.
+# incidence_matrix) and a batch of charts is a sparse (chart x workbook row) placement matrix,
+# one row per body. Their product, computed CSR-style by expanding every matched row and then
+# sorting and compressing the (chart, token) pairs, gives every token count of every chart in
+# one pass. The top-6 aspirations/careers and top-20 rules are then picked with lexsorts that
+# keep count_tokens' first-seen tie-break.
+import copy
+import weakref
+
+import numpy as np
+
+from instrumentation import span
+from legacy_data import CATEGORIES, get_interpretation_index
+from main import NatalChart, SimNatalChart, legacy_result
+from result_cache import RESULT_CACHE
+
+N_BODIES = len(SimNatalChart.BODIES)
+TOP_K = {'aspirations': 6, 'careers': 6, 'rules': 20}
+# Skill labels are pre-formatted for counts below this
+LABEL_COUNTS = 32
+
+
+class LegacyScorer:
+    """Scores batches of compact charts against one workbook snapshot.
+
+    score() returns, per chart, the same six results as
+    CreateLegacyChallenge.aggregate_natal_chart.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.indptr, self.columns, offsets = index.incidence_matrix()
+        self.offsets = offsets.tolist()
+        self.width = self.offsets[-1]
+        # code_rows[body, code] -> workbook row, -1 where no row matches
+        self.code_rows = np.array([
+            [-1 if row_id is None else row_id for row_id in rows]
+            for rows in index.code_rows(SimNatalChart.BODIES, SimNatalChart.ZODIAC_SIGNS)
+        ], dtype=np.int64)
+        self.tokens = np.array([token for category in CATEGORIES for token in index.vocabularies[category]], dtype=object)
+        # Position of every token in its category's sorted() order
+        self.alphabetical = np.empty(self.width, dtype=np.int64)
+        for category, offset in zip(CATEGORIES, self.offsets):
+            vocabulary = index.vocabularies[category]
+            order = sorted(range(len(vocabulary)), key=vocabulary.__getitem__)
+            self.alphabetical[np.add(order, offset, dtype=np.int64)] = np.arange(len(vocabulary))
+        # labels[column, count]: the result key of a skill seen count times, as aggregate_natal_chart formats it
+        self.labels = np.empty((self.width, LABEL_COUNTS), dtype=object)
+        for column in range(self.offsets[CATEGORIES.index('best_skills')], self.offsets[CATEGORIES.index('rules')]):
+            self.labels[column] = [self.label(column, count) for count in range(LABEL_COUNTS)]
+
+    def label(self, column, count):
+        if column >= self.offsets[CATEGORIES.index('worst_skills')]:
+            return f"{self.tokens[column]} (-{count})"
+        return f"{self.tokens[column]} (+{count + 1})"
+
+    def token_counts(self, codes):
+        # (chart, column, count, first_seen) of every token present, sorted by chart then column;
+        # first_seen orders each chart's tokens the way count_tokens first meets them
+        rows = self.code_rows[np.arange(N_BODIES), codes]
+        matched = rows >= 0
+        charts, rows = np.nonzero(matched)[0], rows[matched]
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        ends = np.cumsum(lengths)
+        entries = np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+        keys = np.repeat(charts, lengths) * self.width + self.columns[entries]
+        keys, first_seen, counts = np.unique(keys, return_index=True, return_counts=True)
+        return keys // self.width, keys % self.width, counts, first_seen
+
+    def select(self, codes):
+        # Yields (category, chart, column, count) arrays with every token of every chart's final
+        # result, grouped by chart and in the order aggregate_natal_chart lists them
+        charts, columns, counts, first_seen = self.token_counts(codes)
+        for category, start, stop in zip(CATEGORIES, self.offsets, self.offsets[1:]):
+            selected = np.flatnonzero((columns >= start) & (columns < stop))
+            chart, column, count = charts[selected], columns[selected], counts[selected]
+            if category == 'traits':
+                order = np.lexsort((self.alphabetical[column], chart))
+            elif category in TOP_K:
+                # Most frequent first, ties in first-seen order, cut at k per chart
+                order = np.lexsort((first_seen[selected], -count, chart))
+                rank = np.arange(len(order)) - np.searchsorted(chart[order], chart[order])
+                order = order[rank < TOP_K[category]]
+                if category == 'rules':
+                    order = order[np.lexsort((self.alphabetical[column[order]], chart[order]))]
+            else:
+                order = np.lexsort((first_seen[selected], chart))
+            yield category, chart[order], column[order], count[order]
+
+    def score(self, codes):
+        # codes: (charts, 20) compact placement codes, one row per NatalChart.codes
+        codes = np.asarray(codes, dtype=np.intp).reshape(-1, N_BODIES)
+        with span("batch_scoring"):
+            results = [[] for _ in range(len(codes))]
+            for category, chart, column, count in self.select(codes):
+                bounds = np.searchsorted(chart, np.arange(len(codes) + 1)).tolist()
+                if category.endswith('_skills'):
+                    labels = self.labels[column, np.minimum(count, LABEL_COUNTS - 1)]
+                    for number in np.flatnonzero(count >= LABEL_COUNTS).tolist():
+                        labels[number] = self.label(column[number], count[number])
+                    labels, count = labels.tolist(), count.tolist()
+                    for result, start, stop in zip(results, bounds, bounds[1:]):
+                        result.append(dict(zip(labels[start:stop], count[start:stop])))
+                else:
+                    tokens = self.tokens[column].tolist()
+                    for result, start, stop in zip(results, bounds, bounds[1:]):
+                        result.append(tokens[start:stop])
+        return [tuple(result) for result in results]
+
+    def outcome_counts(self, codes, weights=None):
+        # How many charts (or how much weight) list each token column in their final result
+        codes = np.asarray(codes, dtype=np.intp).reshape(-1, N_BODIES)
+        totals = np.zeros(self.width)
+        for _, chart, column, _ in self.select(codes):
+            totals += np.bincount(column, None if weights is None else weights[chart], minlength=self.width)
+        return totals
+
+
+_SCORERS = weakref.WeakKeyDictionary()
+
+
+def get_scorer(index=None):
+    # One scorer per workbook snapshot, dropped together with the snapshot
+    if index is None:
+        index = get_interpretation_index()
+    scorer = _SCORERS.get(index)
+    if scorer is None:
+        scorer = _SCORERS[index] = LegacyScorer(index)
+    return scorer
+
+
+def filter_natal_charts(natal_charts, index=None):
+    # CreateLegacyChallenge(chart).filter_natal_chart() for many NatalCharts, sharing the result cache
+    if index is None:
+        index = get_interpretation_index()
+    keys = [(index.version, natal_chart.codes) for natal_chart in natal_charts]
+    results = [RESULT_CACHE.get(key) for key in keys]
+    missing = [number for number, result in enumerate(results) if result is None]
+    if missing:
+        codes = np.frombuffer(b''.join(keys[number][1] for number in missing), dtype=np.uint8).reshape(-1, N_BODIES)
+        for number, result in zip(missing, get_scorer(index).score(codes)):
+            RESULT_CACHE.put(keys[number], result)
+            results[number] = result
+    # Hand out copies so callers can't mutate what is cached
+    return [tuple(copy.copy(part) for part in result) for result in results]
+
+
+def legacy_results(generated_charts):
+    # legacy_result for a whole batch of generated charts
+    scored = [number for number, chart in enumerate(generated_charts) if isinstance(chart['planetary_positions'], NatalChart)]
+    legacies = dict(zip(scored, filter_natal_charts([generated_charts[number]['planetary_positions'] for number in scored])))
+    return [legacy_result(generated_chart, legacies.get(number)) for number, generated_chart in enumerate(generated_charts)]
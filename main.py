@@ -1,9 +1,13 @@
 #preshypily@gmail.com
+import copy
 import math
+from collections.abc import Mapping
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
-from sims4_globe import Sims4Globe
+from sims4_globe import GLOBE
+from legacy_data import DATA_REGISTRY, clean_split, get_interpretation_index  # noqa: F401 (re-exported)
+from result_cache import RESULT_CACHE, chart_signature
+from instrumentation import span
 
 class SimNatalChart:
     ZODIAC_SIGNS = [
@@ -12,6 +16,41 @@ class SimNatalChart:
     ]
     HOUSES = range(1, 13)
 
+    PLANETS = (
+        "sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune",
+        "pluto", "north_node", "south_node", "lilith", "chiron", "fortune", "vertex"
+    )
+    # Mean longitude L0 and mean anomaly g0 at J2000 with their daily rates, one row per planet
+    ORBITAL_ELEMENTS = np.array([
+        # L0,     g0,      rateL,      rateg
+        [280.460, 357.528, 0.9856474, 0.98560028],  # sun
+        [218.316, 134.963, 13.176396, 13.176396],   # moon
+        [252.250, 77.456, 4.0923388, 4.0923388],    # mercury
+        [181.979, 131.563, 1.6021303, 1.6021303],   # venus
+        [355.433, 336.040, 0.5240208, 0.5240208],   # mars
+        [34.351, 14.331, 0.083091, 0.083091],       # jupiter
+        [50.077, 93.056, 0.033459, 0.033459],       # saturn
+        [314.055, 173.005, 0.011733, 0.011733],     # uranus
+        [304.348, 48.123, 0.006021, 0.006021],      # neptune
+        [238.929, 224.066, 0.003963, 0.003963],     # pluto
+        [174.873, 123.448, 0.001479, 0.001479],     # north_node
+        [354.873, 243.448, 0.001479, 0.001479],     # south_node
+        [120.982, 142.102, 0.004925, 0.004925],     # lilith
+        [209.515, 172.439, 0.007166, 0.007166],     # chiron
+        [238.929, 224.066, 0.003963, 0.003963],     # fortune
+        [238.929, 224.066, 0.003963, 0.003963],     # vertex
+    ])
+    # The same rows as plain floats for the scalar single-chart path
+    ORBITAL_ELEMENT_ROWS = tuple(map(tuple, ORBITAL_ELEMENTS.tolist()))
+    ANGLES = ("midheaven", "ascendant", "descendant", "ic")
+    BODIES = PLANETS + ANGLES
+
+    # julian_date(datetime(1, 1, 1)), the epoch bce_to_julian_date counts back from
+    JD_YEAR_ONE = 1721425.5
+
+    # Optional precomputed ChartTable (see chart_table.py); None means always compute live
+    CHART_TABLE = None
+
     def __init__(self, sim_age, birth_location, current_sim_day, sim_year_days=28, sim_season_days=7):
         self.sim_age = sim_age
         self.birth_location = birth_location
@@ -56,209 +95,295 @@ class SimNatalChart:
         jd_start_of_year = self.julian_date(datetime(year=1, month=1, day=1)) - (year * 365.25)
         return jd_start_of_year + day_of_year
 
-    def calculate_planetary_positions(self, jd):
-        def calc_position(L, g):
-            L = (L + 1.915 * math.sin(math.radians(g)) + 0.020 * math.sin(math.radians(2 * g))) % 360
-            return L
-
-        def planet_position(jd, L0, g0, n0, rateL, rateg):
-            n = jd - 2451545.0
-            L = (L0 + rateL * n) % 360
-            g = (g0 + rateg * n) % 360
-            return calc_position(L, g)
+    # The ephemeris formulas, written once for both paths: calculate_planetary_positions passes
+    # floats and the math functions, batch_planetary_positions arrays and their NumPy equivalents
+    @staticmethod
+    def planet_longitude(jd, L0, g0, rateL, rateg, sin=math.sin, radians=math.radians):
+        n = jd - 2451545.0
+        L = (L0 + rateL * n) % 360
+        g = (g0 + rateg * n) % 360
+        return (L + 1.915 * sin(radians(g)) + 0.020 * sin(radians(2 * g))) % 360
+
+    # Terms of the ascendant and midheaven formulas that are the same for every chart, for
+    # E = 90 degrees and the obliquity of the ecliptic w = 23.44 degrees
+    SIN_E = math.sin(math.radians(90))
+    COS_E_COS_W = math.cos(math.radians(90)) * math.cos(math.radians(23.44))
+    SIN_W = math.sin(math.radians(23.44))
+    MIDHEAVEN = math.degrees(math.atan(math.tan(math.radians(90)) / math.cos(math.radians(23.44))))
+
+    @classmethod
+    def ascendant_longitude(cls, latitude, tan=math.tan, radians=math.radians, atan=math.atan, degrees=math.degrees):
+        return degrees(atan(cls.SIN_E / (cls.COS_E_COS_W - cls.SIN_W * tan(radians(latitude)))))
+
+    @classmethod
+    def angle_longitudes(cls, ascendant):
+        # midheaven, ascendant, descendant and ic, in ANGLES order
+        return cls.MIDHEAVEN, ascendant, (ascendant + 180) % 360, (cls.MIDHEAVEN + 180) % 360
 
+    def calculate_planetary_positions(self, jd):
+        # One chart with math: far quicker than a one-row batch_planetary_positions call
+        planet_longitude = self.planet_longitude
         positions = {
-            "sun": planet_position(jd, 280.460, 357.528, 0, 0.9856474, 0.98560028),
-            "moon": planet_position(jd, 218.316, 134.963, 0, 13.176396, 13.176396),
-            "mercury": planet_position(jd, 252.250, 77.456, 0, 4.0923388, 4.0923388),
-            "venus": planet_position(jd, 181.979, 131.563, 0, 1.6021303, 1.6021303),
-            "mars": planet_position(jd, 355.433, 336.040, 0, 0.5240208, 0.5240208),
-            "jupiter": planet_position(jd, 34.351, 14.331, 0, 0.083091, 0.083091),
-            "saturn": planet_position(jd, 50.077, 93.056, 0, 0.033459, 0.033459),
-            "uranus": planet_position(jd, 314.055, 173.005, 0, 0.011733, 0.011733),
-            "neptune": planet_position(jd, 304.348, 48.123, 0, 0.006021, 0.006021),
-            "pluto": planet_position(jd, 238.929, 224.066, 0, 0.003963, 0.003963),
-            "north_node": planet_position(jd, 174.873, 123.448, 0, 0.001479, 0.001479),
-            "south_node": planet_position(jd, 354.873, 243.448, 0, 0.001479, 0.001479),
-            "lilith": planet_position(jd, 120.982, 142.102, 0, 0.004925, 0.004925),
-            "chiron": planet_position(jd, 209.515, 172.439, 0, 0.007166, 0.007166),
-            "fortune": planet_position(jd, 238.929, 224.066, 0, 0.003963, 0.003963),
-            "vertex": planet_position(jd, 238.929, 224.066, 0, 0.003963, 0.003963)
+            planet: planet_longitude(jd, L0, g0, rateL, rateg)
+            for planet, (L0, g0, rateL, rateg) in zip(self.PLANETS, self.ORBITAL_ELEMENT_ROWS)
         }
-
-        E, w, A = 90, 23.44, self.birth_location['latitude']
-        ascendant = math.degrees(
-            math.atan(
-                math.sin(math.radians(E)) /
-                (math.cos(math.radians(E)) * math.cos(math.radians(w)) -
-                 math.sin(math.radians(w)) * math.tan(math.radians(A)))))
-        mc = math.degrees(
-            math.atan(math.tan(math.radians(90)) / math.cos(math.radians(w))))
-
-        positions.update({
-            "midheaven": mc,
-            "ascendant": ascendant,
-            "descendant": (ascendant + 180) % 360,
-            "ic": (mc + 180) % 360
-        })
+        ascendant = self.ascendant_longitude(self.birth_location['latitude'])
+        positions.update(zip(self.ANGLES, self.angle_longitudes(ascendant)))
         return positions
 
+    @classmethod
+    def batch_planetary_positions(cls, jds, latitudes):
+        # Ecliptic longitudes for every body, shape (n_dates, n_bodies) in BODIES order.
+        # latitudes broadcasts against jds, so a single latitude works for a whole batch.
+        jds = np.asarray(jds, dtype=float)
+        latitudes = np.broadcast_to(np.asarray(latitudes, dtype=float), jds.shape)
+
+        planets = cls.planet_longitude(jds[:, None], *cls.ORBITAL_ELEMENTS.T, sin=np.sin, radians=np.radians)
+        ascendant = cls.ascendant_longitude(
+            latitudes, tan=np.tan, radians=np.radians, atan=np.arctan, degrees=np.degrees)
+        angles = np.column_stack([np.broadcast_to(angle, jds.shape) for angle in cls.angle_longitudes(ascendant)])
+        return np.hstack([planets, angles])
+
+    @classmethod
+    def batch_julian_dates(cls, birth_years, birth_days_of_year):
+        # Vectorised bce_to_julian_date for arrays of (birth_year, birth_day_of_year)
+        return (cls.JD_YEAR_ONE - np.asarray(birth_years) * 365.25) + np.asarray(birth_days_of_year)
+
     def generate_natal_chart(self):
-        planetary_positions = self.calculate_planetary_positions(self.jd)
-        zodiac_chart = self.assign_to_zodiac_and_houses(planetary_positions)
+        zodiac_chart = None
+        if self.CHART_TABLE is not None:
+            with span("chart_table_lookup"):
+                zodiac_chart = self.CHART_TABLE.lookup(self.birthdate, self.birth_location['latitude'])
+        if zodiac_chart is None:
+            with span("ephemeris"):
+                planetary_positions = self.calculate_planetary_positions(self.jd)
+                zodiac_chart = self.assign_to_zodiac_and_houses(planetary_positions)
         formatted_birthdate = format_birthdate(self.birthdate, self.SIM_SEASON_DAYS)
         return {
             'planetary_positions': zodiac_chart,
             'formatted_birthdate': formatted_birthdate
         }
 
+    @classmethod
+    def generate_natal_charts(cls, natal_charts):
+        # generate_natal_chart for many Sims at once with a single vectorised ephemeris pass
+        if not natal_charts:
+            return []
+        longitudes = cls.batch_planetary_positions(
+            [natal_chart.jd for natal_chart in natal_charts],
+            [natal_chart.birth_location['latitude'] for natal_chart in natal_charts]
+        )
+        sign_indexes, houses = cls.batch_signs_and_houses(longitudes)
+
+        codes = ((sign_indexes << 4) | houses).astype(np.uint8)
+
+        generated_charts = []
+        for natal_chart, chart_codes in zip(natal_charts, codes):
+            generated_charts.append({
+                'planetary_positions': NatalChart(chart_codes.tobytes()),
+                'formatted_birthdate': format_birthdate(natal_chart.birthdate, natal_chart.SIM_SEASON_DAYS)
+            })
+        return generated_charts
+
     def assign_to_zodiac_and_houses(self, planetary_positions):
-        zodiac_chart = {}
-        for planet, position in planetary_positions.items():
-            sign_index = int(position // 30)
-            house = (sign_index + 1) % 12 + 1
-            zodiac_chart[planet] = {
-                "sign": self.ZODIAC_SIGNS[sign_index],
-                "house": house
-            }
-        return zodiac_chart
+        # planetary_positions maps every body in BODIES to its longitude
+        return NatalChart.from_signs([int(planetary_positions[body] // 30) for body in self.BODIES])
+
+    @staticmethod
+    def batch_signs_and_houses(longitudes):
+        # Vectorised assign_to_zodiac_and_houses: sign indexes into ZODIAC_SIGNS (0-11) and houses (1-12)
+        sign_index = np.floor_divide(longitudes, 30).astype(np.int64)
+        houses = (sign_index + 1) % 12 + 1
+        return sign_index % 12, houses
+
+
+class NatalChart(Mapping):
+    """Compact natal chart: one byte per body of SimNatalChart.BODIES, sign index << 4 | house.
+
+    Reads like the {body: {"sign": ..., "house": ...}} dict charts used to be, and to_dict()
+    builds that dict for templates and JSON. The legacy aggregation and the chart figure
+    work from the codes directly.
+    """
+    __slots__ = ('codes',)
+
+    BODY_INDEX = {body: index for index, body in enumerate(SimNatalChart.BODIES)}
+
+    def __init__(self, codes):
+        codes = bytes(codes)
+        if len(codes) != len(SimNatalChart.BODIES):
+            raise ValueError(f"Expected {len(SimNatalChart.BODIES)} placements, got {len(codes)}")
+        self.codes = codes
+
+    @classmethod
+    def from_signs(cls, sign_indexes):
+        # Generated charts: the house always follows the sign
+        return cls(((sign_index % 12) << 4) | ((sign_index + 1) % 12 + 1) for sign_index in sign_indexes)
+
+    @staticmethod
+    def encode(body, sign, house):
+        # One chart byte; a house past 15 would otherwise carry into the sign bits
+        if sign not in SimNatalChart.ZODIAC_SIGNS:
+            raise ValueError(f"Unknown sign {sign!r} for {body}")
+        if not isinstance(house, (int, np.integer)) or not 1 <= house <= 12:
+            raise ValueError(f"Expected a house from 1 to 12 for {body}, got {house!r}")
+        return SimNatalChart.ZODIAC_SIGNS.index(sign) << 4 | house
+
+    @classmethod
+    def from_dict(cls, zodiac_chart):
+        return cls(
+            cls.encode(body, zodiac_chart[body]['sign'], zodiac_chart[body]['house'])
+            for body in SimNatalChart.BODIES
+        )
+
+    @classmethod
+    def from_token(cls, token):
+        natal_chart = cls(bytes.fromhex(token))
+        for body, code in zip(SimNatalChart.BODIES, natal_chart.codes):
+            if code >> 4 >= 12 or not 1 <= code & 0x0F <= 12:
+                raise ValueError(f"Invalid placement {code:02x} for {body} in token")
+        return natal_chart
+
+    @property
+    def token(self):
+        return self.codes.hex()
+
+    def placements(self):
+        # (body, sign index, house) for every body, in chart order
+        return [(body, (code >> 4) % 12, code & 0x0F) for body, code in zip(SimNatalChart.BODIES, self.codes)]
+
+    def to_dict(self):
+        return {
+            body: {"sign": SimNatalChart.ZODIAC_SIGNS[sign_index], "house": house}
+            for body, sign_index, house in self.placements()
+        }
+
+    def __getitem__(self, body):
+        code = self.codes[self.BODY_INDEX[body]]
+        return {"sign": SimNatalChart.ZODIAC_SIGNS[(code >> 4) % 12], "house": code & 0x0F}
+
+    def __iter__(self):
+        return iter(SimNatalChart.BODIES)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __eq__(self, other):
+        if isinstance(other, NatalChart):
+            return self.codes == other.codes
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(self.codes)
+
+    def __repr__(self):
+        return f"NatalChart({self.token!r})"
 
 
+def as_natal_chart(natal_chart):
+    # NatalChart for a complete chart dict in BODIES order; anything else is returned unchanged
+    if isinstance(natal_chart, NatalChart):
+        return natal_chart
+    if list(natal_chart) == list(SimNatalChart.BODIES):
+        try:
+            return NatalChart.from_dict(natal_chart)
+        except (KeyError, TypeError, ValueError):
+            pass
+    return natal_chart
+
+
+# Entries for an older workbook can never be hit again once a new one is swapped in
+DATA_REGISTRY.subscribe(lambda previous, current: RESULT_CACHE.clear())
 
 
 class CreateLegacyChallenge:
 
     def __init__(self, natal_chart):
-        self.natal_chart = natal_chart
+        self.natal_chart = as_natal_chart(natal_chart)
 
     def filter_natal_chart(self):
-        result_text = ""
-        file_path = 'static/natal_planets_houses_allzodiacs.xlsx'
-        df = pd.read_excel(file_path, engine='openpyxl')
+        index = get_interpretation_index()
+        with span("result_cache_lookup"):
+            # Results are only valid for the workbook version they were computed from
+            if isinstance(self.natal_chart, NatalChart):
+                key = (index.version, self.natal_chart.codes)
+            else:
+                key = (index.version, chart_signature(self.natal_chart))
+            results = RESULT_CACHE.get(key)
+        if results is None:
+            results = self.aggregate_natal_chart(index)
+            if results is None:
+                print("No matching rows found.")
+                return set(), set(), set(), {}, {}, []
+            RESULT_CACHE.put(key, results)
+
+        # Hand out copies so callers can't mutate what is cached
+        return tuple(copy.copy(result) for result in results)
+
+    def text_report(self):
+        return render_text_report(*self.filter_natal_chart())
+
+    def export_text_report(self, output_file_path):
+        with open(output_file_path, 'w') as file:
+            file.write(self.text_report())
+
+    def aggregate_natal_chart(self, index=None):
+        if index is None:
+            index = get_interpretation_index()
 
         matching_rows = []
         natal_chart = self.natal_chart
 
-        for planet, info in natal_chart.items():
-            if isinstance(info, dict):
-                matches = df[(df['Planet'] == planet.title())
-                             & (df['Zodiac'] == info['sign']) &
-                             (df['House'] == info['house'])]
-                matching_rows.append(matches)
-
-        if matching_rows:
-            result_df = pd.concat(matching_rows)
-        else:
-            print("No matching rows found.")
-            return set(), set(), set(), {}, {}, []
-
-        columns_of_interest = [
-            'Trait(s)', 'Aspiration(s)', 'Career', 'Best Skill(s)',
-            'Worst Skill(s)', 'Rule(s)'
-        ]
-        result_df = result_df[columns_of_interest]
-
-        traits_counts, aspirations_set, careers_set = {}, set(), set()
-        best_skills_counts, worst_skills_counts, rules_list = {}, {}, []
-
-        separators = [',', '.']
-
-        aspiration_counts = {}
-        career_counts = {}
-        rule_counts = {}
-
-        for _, row in result_df.iterrows():
-            traits = row['Trait(s)'].split(', ')
-            aspirations = row['Aspiration(s)'].split(', ')
-            careers = row['Career'].split(', ')
-            best_skills = row['Best Skill(s)'].split(', ')
-            worst_skills = row['Worst Skill(s)'].split(', ')
-            rules = row['Rule(s)'].split('. ')
-
-            for trait in traits:
-                trait_cleaned = clean_split(trait, separators)
-                if trait_cleaned in traits_counts:
-                    traits_counts[trait_cleaned] += 1
-                else:
-                    traits_counts[trait_cleaned] = 1
-
-            for aspiration in aspirations:
-                aspirations_set.add(clean_split(aspiration, separators))
-                if aspiration in aspiration_counts:
-                    aspiration_counts[aspiration] += 1
-                else:
-                    aspiration_counts[aspiration] = 1
-
-            for career in careers:
-                careers_set.add(clean_split(career, separators))
-                if career in career_counts:
-                    career_counts[career] += 1
-                else:
-                    career_counts[career] = 1
-
-            for skill in best_skills:
-                skill_cleaned = clean_split(skill, separators)
-                if skill_cleaned in best_skills_counts:
-                    best_skills_counts[skill_cleaned] += 1
-                else:
-                    best_skills_counts[skill_cleaned] = 1
-
-            for skill in worst_skills:
-                skill_cleaned = clean_split(skill, separators)
-                if skill_cleaned in worst_skills_counts:
-                    worst_skills_counts[skill_cleaned] += 1
-                else:
-                    worst_skills_counts[skill_cleaned] = 1
-
-            for rule in rules:
-                if "Must master" in rule:
-                    rule_parts = rule.split(" and ")
-                    for part in rule_parts:
-                        part_cleaned = part.replace("Must master", "").strip().capitalize()
-                        rule_cleaned = f"Must master {part_cleaned}"
-                else:
-                    rule_parts = rule.split(", ")
-                    for part in rule_parts:
-                        part_cleaned = part.capitalize().strip()
-                        if part_cleaned.startswith("And "):
-                            part_cleaned = part_cleaned[4:]
-                        rule_cleaned = part_cleaned
-
-                if rule_cleaned in rule_counts:
-                    rule_counts[rule_cleaned] += 1
-                else:
-                    rule_counts[rule_cleaned] = 1
-                rules_list.append(rule_cleaned)
-
-        top_aspirations = sorted(aspiration_counts, key=aspiration_counts.get, reverse=True)[:6]
-        top_careers = sorted(career_counts, key=career_counts.get, reverse=True)[:6]
-        top_rules = sorted(rule_counts, key=rule_counts.get, reverse=True)[:20]
-        top_rules.sort()
-
-        final_best_skills = {
-            f"{skill} (+{count+1})": count for skill, count in best_skills_counts.items()
-        }
-        final_worst_skills = {
-            f"{skill} (-{count})": count for skill, count in worst_skills_counts.items()
-        }
+        with span("row_matching"):
+            if isinstance(natal_chart, NatalChart):
+                code_rows = index.code_rows(SimNatalChart.BODIES, SimNatalChart.ZODIAC_SIGNS)
+                matching_rows = [rows[code] for rows, code in zip(code_rows, natal_chart.codes)]
+            else:
+                for planet, info in natal_chart.items():
+                    if isinstance(info, dict):
+                        matching_rows.append(index.lookup(planet.title(), info['sign'], info['house']))
+
+        if not matching_rows:
+            return None
+
+        with span("token_counting"):
+            counts = index.count_tokens(row for row in matching_rows if row is not None)
+        traits_counts = counts['traits']
+        aspiration_counts = counts['aspirations']
+        career_counts = counts['careers']
+        best_skills_counts = counts['best_skills']
+        worst_skills_counts = counts['worst_skills']
+        rule_counts = counts['rules']
+
+        with span("result_sorting"):
+            top_aspirations = sorted(aspiration_counts, key=aspiration_counts.get, reverse=True)[:6]
+            top_careers = sorted(career_counts, key=career_counts.get, reverse=True)[:6]
+            top_rules = sorted(rule_counts, key=rule_counts.get, reverse=True)[:20]
+            top_rules.sort()
+
+            final_best_skills = {
+                f"{skill} (+{count+1})": count for skill, count in best_skills_counts.items()
+            }
+            final_worst_skills = {
+                f"{skill} (-{count})": count for skill, count in worst_skills_counts.items()
+            }
 
-        # Sort traits by occurrences
-        sorted_traits = sorted(traits_counts, key=traits_counts.get, reverse=True)
-        sorted_traits.sort()
+            # Sort traits by occurrences
+            sorted_traits = sorted(traits_counts, key=traits_counts.get, reverse=True)
+            sorted_traits.sort()
 
-        result_text += "\nTraits:\n" + "\n".join(sorted(sorted_traits)) + "\n\n"
-        result_text += "Aspirations:\n" + "\n".join(sorted(top_aspirations)) + "\n\n"
-        result_text += "Careers:\n" + "\n".join(sorted(top_careers)) + "\n\n"
-        result_text += "Best Skills:\n" + "\n".join([f"{skill} (+{count+1})" for skill, count in sorted(final_best_skills.items(), key=lambda item: item[1], reverse=True)]) + "\n\n"
-        result_text += "Worst Skills:\n" + "\n".join([f"{skill} (-{count})" for skill, count in sorted(final_worst_skills.items(), key=lambda item: item[1], reverse=True)]) + "\n\n"
-        result_text += "Rules:\n" + "\n".join(top_rules) + "\n"
+        return sorted_traits, top_aspirations, top_careers, final_best_skills, final_worst_skills, top_rules
 
-        output_file_path = 'cleaned_natal_chart_results.txt'
 
-        with open(output_file_path, 'w') as file:
-            file.write(result_text)
+def render_text_report(sorted_traits, top_aspirations, top_careers, final_best_skills, final_worst_skills, top_rules):
+    result_text = ""
+    result_text += "\nTraits:\n" + "\n".join(sorted(sorted_traits)) + "\n\n"
+    result_text += "Aspirations:\n" + "\n".join(sorted(top_aspirations)) + "\n\n"
+    result_text += "Careers:\n" + "\n".join(sorted(top_careers)) + "\n\n"
+    result_text += "Best Skills:\n" + "\n".join([f"{skill} (+{count+1})" for skill, count in sorted(final_best_skills.items(), key=lambda item: item[1], reverse=True)]) + "\n\n"
+    result_text += "Worst Skills:\n" + "\n".join([f"{skill} (-{count})" for skill, count in sorted(final_worst_skills.items(), key=lambda item: item[1], reverse=True)]) + "\n\n"
+    result_text += "Rules:\n" + "\n".join(top_rules) + "\n"
+    return result_text
 
-        return sorted_traits, top_aspirations, top_careers, final_best_skills, final_worst_skills, top_rules
 
 def format_birthdate(birthdate, sim_season_days):
     seasons = ["Spring", "Summer", "Fall", "Winter"]
@@ -289,9 +414,66 @@ def lat_lon_to_xyz(lat, lon, radius=80.47):
     return x, y, z
 
 
+def parse_coordinates(coordinates):
+    if isinstance(coordinates, (list, tuple)):
+        coordinates = ','.join(str(value) for value in coordinates)
+    if coordinates:
+        try:
+            x, y, z = map(float, coordinates.split(','))
+        except ValueError:
+            x, y, z = 0.0, 0.0, 0.0  # Default coordinates if not provided or invalid
+        if not all(map(math.isfinite, (x, y, z))):
+            x, y, z = 0.0, 0.0, 0.0
+    else:
+        x, y, z = 0.0, 0.0, 0.0  # Default coordinates if not provided
+    return x, y, z
+
+
+def natal_chart_from_inputs(inputs):
+    sim_age = int(inputs['sim_age'])
+    sim_year_days = int(inputs['sim_year_days'])
+    sim_season_days = int(inputs['sim_season_days'])
+    birth_location = inputs['birth_location']
+    x, y, z = parse_coordinates(inputs.get('coordinates'))
+    current_sim_day = int(inputs['current_sim_day'])
+    if sim_year_days <= 0 or sim_season_days <= 0:
+        raise ValueError("sim_year_days and sim_season_days must be positive")
+
+    location = GLOBE.get_location(birth_location, x, y, z)
+
+    return SimNatalChart(sim_age, location, current_sim_day, sim_year_days, sim_season_days)
+
+
+# What natal_chart_from_inputs raises for a malformed input row
+INPUT_ERRORS = (KeyError, TypeError, ValueError, AttributeError, OverflowError)
+
+
+def describe_input_error(error):
+    if isinstance(error, KeyError):
+        return f"Missing field {error}"
+    return str(error)
+
+
+def legacy_result(generated_chart, legacy=None):
+    # JSON-ready chart plus legacy challenge, shared by the batch API and the bulk CLI; legacy is
+    # the filter_natal_chart() result when it has already been computed (see legacy_scoring)
+    if legacy is None:
+        legacy = CreateLegacyChallenge(generated_chart['planetary_positions']).filter_natal_chart()
+    traits, aspirations, careers, best_skills, worst_skills, rules = legacy
+    return {
+        "natal_chart": generated_chart['planetary_positions'].to_dict(),
+        "formatted_birthdate": generated_chart['formatted_birthdate'],
+        "traits": list(traits),
+        "aspirations": list(aspirations),
+        "careers": list(careers),
+        "best_skills": best_skills,
+        "worst_skills": worst_skills,
+        "rules": list(rules)
+    }
+
+
 def calculate_natal_chart(world_name, x, y, z):
-    globe = Sims4Globe()
-    location = globe.get_location(world_name, x, y, z)
+    location = GLOBE.get_location(world_name, x, y, z)
     #print(f"\nCalculating natal chart for location: {location}\n")
     return location
 
@@ -304,7 +486,25 @@ def pretty_print_natal_chart(natal_chart):
         )
 
 
-def clean_split(entry, separators):
-    for sep in separators:
-        entry = entry.split(sep)[0]
-    return entry.strip()
\ No newline at end of file
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate a Sim natal chart and legacy challenge')
+    parser.add_argument('--sim-age', type=int, required=True)
+    parser.add_argument('--birth-location', required=True)
+    parser.add_argument('--current-sim-day', type=int, required=True)
+    parser.add_argument('--sim-year-days', type=int, default=28)
+    parser.add_argument('--sim-season-days', type=int, default=7)
+    parser.add_argument('--report', metavar='PATH', help='also write the text report to PATH')
+    args = parser.parse_args()
+
+    location = calculate_natal_chart(args.birth_location, 0.0, 0.0, 0.0)
+    natal_chart = SimNatalChart(args.sim_age, location, args.current_sim_day, args.sim_year_days, args.sim_season_days)
+    generated_chart = natal_chart.generate_natal_chart()
+    print(generated_chart['formatted_birthdate'])
+    pretty_print_natal_chart(generated_chart['planetary_positions'])
+
+    legacychallenge = CreateLegacyChallenge(generated_chart['planetary_positions'])
+    print(legacychallenge.text_report())
+    if args.report:
+        legacychallenge.export_text_report(args.report)
@@ -0,0 +1,212 @@
+#preshypily@gmail.com
+# Per-worker memory reporting and a memory budget.
+#
+# LEGACY_MEMORY_TRACE_FRAMES=N (off by default, tracing slows every allocation) starts
+# tracemalloc with N frames per allocation when this module is imported, so /admin/memory can
+# break the traced heap down by subsystem. LEGACY_MEMORY_BUDGET_MB turns on the guard: every
+# LEGACY_MEMORY_CHECK_SECONDS it compares the worker's private memory with the budget, clears
+# the registered caches when it is over, and if that does not bring it back under, asks a
+# gunicorn worker to shut down gracefully so the master replaces it with a fresh one.
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+TRACE_FRAMES = int(os.environ.get('LEGACY_MEMORY_TRACE_FRAMES', 0))
+if TRACE_FRAMES > 0 and not tracemalloc.is_tracing():
+    tracemalloc.start(TRACE_FRAMES)
+
+# Allocations are put in the first subsystem (innermost frame first) whose module or package
+# appears in their traceback; anything else, Flask and the interpreter included, is "other"
+SUBSYSTEMS = (
+    ('workbook data', ('legacy_data.py', 'openpyxl', 'pandas')),
+    ('figures', ('natal_figure.py', 'dashboard.py', 'plotly', '_plotly_utils', 'dash')),
+    ('legacy results', ('legacy_scoring.py', 'legacy_planner.py', 'result_cache.py', 'main.py')),
+    ('chart tables', ('chart_table.py', 'legacy_rarity.py', 'inverse_search.py', 'sims4_globe.py')),
+    ('templates', ('jinja2',)),
+)
+OTHER = 'other'
+_file_subsystems = {}
+
+
+def subsystem_of(traceback):
+    for frame in reversed(traceback):
+        name = _file_subsystems.get(frame.filename)
+        if name is None:
+            parts = set(frame.filename.replace('\\', '/').split('/'))
+            name = _file_subsystems[frame.filename] = next(
+                (subsystem for subsystem, modules in SUBSYSTEMS if parts.intersection(modules)), '')
+        if name:
+            return name
+    return OTHER
+
+
+def resident_bytes():
+    # Current resident set size of this process, or None where it can't be read
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def private_bytes():
+    # Resident memory only this process holds, i.e. not shared with the gunicorn master or other
+    # workers; falls back to the resident size where /proc/self/smaps_rollup is missing
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            return sum(
+                int(line.split()[1]) * 1024 for line in smaps
+                if line.startswith(('Private_Clean:', 'Private_Dirty:'))
+            )
+    except (OSError, ValueError, IndexError):
+        return resident_bytes()
+
+
+def peak_resident_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def traced_report(top=10):
+    # Traced heap by subsystem plus the largest allocation sites; None when tracing is off
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    subsystems = {}
+    for statistic in snapshot.statistics('traceback'):
+        totals = subsystems.setdefault(subsystem_of(statistic.traceback), {"bytes": 0, "blocks": 0})
+        totals["bytes"] += statistic.size
+        totals["blocks"] += statistic.count
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "frames": tracemalloc.get_traceback_limit(),
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "subsystems": dict(sorted(subsystems.items(), key=lambda item: -item[1]["bytes"])),
+        "top": [
+            {
+                "location": f"{statistic.traceback[-1].filename}:{statistic.traceback[-1].lineno}",
+                "subsystem": subsystem_of(statistic.traceback),
+                "bytes": statistic.size,
+                "blocks": statistic.count,
+            }
+            for statistic in snapshot.statistics('lineno')[:top]
+        ],
+    }
+
+
+def under_gunicorn():
+    # Only a gunicorn worker has a master to replace it; SIGTERM anywhere else stops the server
+    return 'gunicorn' in sys.modules and os.getppid() != 1
+
+
+class MemoryGuard:
+    """Keeps a worker's private memory under budget_bytes (0 turns the guard off).
+
+    Pages shared with a preloading gunicorn master (gunicorn.conf.py) are not counted: they
+    are paid for once, however many workers there are, and recycling a worker doesn't free them.
+
+    Caches registered with register() are cleared when the worker goes over budget. If it is
+    still over afterwards (freed memory is not always returned to the OS) and recycling is
+    allowed, the worker sends itself SIGTERM, which gunicorn treats as a graceful shutdown:
+    requests in flight finish and the master starts a replacement. A worker that was already
+    over budget when the guard started is never recycled, since its replacement would be too.
+    """
+
+    def __init__(self, budget_bytes, recycle=True):
+        self.budget_bytes = budget_bytes
+        self.recycle = recycle
+        self.checks = 0
+        self.evictions = 0
+        self.recycles = 0
+        self.last_check = None
+        self.last_private = None
+        self.baseline_private = None
+        self._caches = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, clear, size=None):
+        # clear() empties the cache; size() (optional) reports how many entries it holds
+        self._caches[name] = (clear, size)
+
+    def evict(self):
+        for clear, _ in self._caches.values():
+            clear()
+        gc.collect()
+        self.evictions += 1
+
+    def check(self):
+        # None while under budget, else "evict" or "recycle" for the action taken
+        with self._lock:
+            self.checks += 1
+            self.last_check = time.time()
+            self.last_private = private = private_bytes()
+            if self.budget_bytes <= 0 or private is None or private <= self.budget_bytes:
+                return None
+            self.evict()
+            self.last_private = private = private_bytes()
+            if private <= self.budget_bytes or not self.recycle or not under_gunicorn():
+                return "evict"
+            if self.baseline_private is not None and self.baseline_private >= self.budget_bytes:
+                return "evict"
+            if not self.recycles:
+                os.kill(os.getpid(), signal.SIGTERM)
+            self.recycles += 1
+            return "recycle"
+
+    def start(self, interval):
+        # Check every interval seconds on a daemon thread; no thread without a budget
+        if self.budget_bytes > 0 and interval > 0 and self._thread is None:
+            self.baseline_private = private_bytes()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, args=(interval,), name='memory-guard', daemon=True)
+            self._thread.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "budget_bytes": self.budget_bytes,
+            "recycle": self.recycle,
+            "watching": self._thread is not None,
+            "checks": self.checks,
+            "evictions": self.evictions,
+            "recycles": self.recycles,
+            "last_check": self.last_check,
+            "last_private_bytes": self.last_private,
+            "baseline_private_bytes": self.baseline_private,
+            "caches": {name: size() if size else None for name, (_, size) in self._caches.items()},
+        }
+
+    def report(self, top=10):
+        return {
+            "pid": os.getpid(),
+            "rss_bytes": resident_bytes(),
+            "private_bytes": private_bytes(),
+            "peak_rss_bytes": peak_resident_bytes(),
+            "guard": self.stats(),
+            "traced": traced_report(top),
+        }
@@ -0,0 +1,214 @@
+#preshypily@gmail.com
+# The natal chart figure shown on the dashboard, as a plain plotly figure dict. Building a
+# chart needs no plotly at all; plotly is imported once, the first time the fixed wheel
+# scaffolding is needed, so importing this module stays cheap.
+from functools import lru_cache
+
+from main import NatalChart, SimNatalChart
+
+# Element colors
+ELEMENT_COLORS = {
+    "Wood": "burlywood",
+    "Fire": "red",
+    "Earth": "green",
+    "Metal": "lavender",
+    "Water": "mediumaquamarine",
+    "Air": "darkslategrey"
+}
+
+# Zodiac to element mapping
+ZODIAC_ELEMENTS = {
+    "Aries": "Wood",
+    "Taurus": "Earth",
+    "Gemini": "Air",
+    "Cancer": "Water",
+    "Leo": "Fire",
+    "Virgo": "Earth",
+    "Libra": "Air",
+    "Scorpio": "Metal",
+    "Sagittarius": "Fire",
+    "Capricorn": "Earth",
+    "Aquarius": "Air",
+    "Pisces": "Water"
+}
+
+# Matching colors for each planet
+PLANET_COLORS = {
+    "pluto": "black",
+    "moon": "white",
+    "mars": "red",
+    "sun": "yellow",
+    "uranus": "blue",
+    "venus": "green",
+    "jupiter": "orange",
+    "neptune": "violet",
+    "saturn": "grey",
+    "mercury": "brown",
+    "north_node": "darkslateblue",
+    "south_node": "darksalmon",
+    "vertex": "mediumaquamarine",
+    "chiron": "darkgrey",
+    "lilith": "hotpink",
+    "fortune": "mintcream"
+}
+
+# Correcting specific planets based on observed errors
+ANGLE_CORRECTIONS = {
+    'jupiter': -15,
+    'saturn': -15,
+    'neptune': -15,
+    'north_node': -15,
+    'fortune': -15,
+    'vertex': -20,
+    'pluto': -15
+}
+
+# Sign order around the wheel, starting from the first house
+WHEEL_SIGNS = [
+    "Pisces", "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+    "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius"
+]
+
+# MC, IC, Ascendant and Descendant: chart key, legend name, label text, label position
+CHART_ANGLES = [
+    ("midheaven", "MC", "MC", 'middle right'),
+    ("ic", "IC", "IC", 'middle left'),
+    ("ascendant", "Asc", "   Asc", 'middle left'),
+    ("descendant", "Dsc", "Dsc", 'middle right')
+]
+
+@lru_cache(maxsize=None)
+def natal_chart_base():
+    # The parts of the natal chart figure that never change, built (and validated) once per process
+    import plotly.graph_objs as go
+
+    base = go.Figure()
+
+    # Adding the zodiac signs
+    base.add_trace(go.Scatterpolar(
+        r=[1.2] * 12,
+        theta=[(i * 30 + 15) % 360 for i in range(12)],
+        mode='text',
+        text=WHEEL_SIGNS,
+        textposition='middle center',
+        hoverinfo='none',
+        showlegend=False
+    ))
+
+    # Adding the house numbers
+    base.add_trace(go.Scatterpolar(
+        r=[0.3] * 12,
+        theta=[(i * 30 + 15) % 360 for i in range(12)],
+        mode='text',
+        text=[f"{house}" for house in range(1, 13)],
+        textposition='middle center',
+        hoverinfo='none',
+        showlegend=False
+    ))
+
+    base.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=False, range=[0, 1.25]),
+            angularaxis=dict(visible=True, tickmode='array', tickvals=[i * 30 for i in range(12)], ticktext=WHEEL_SIGNS, showticklabels=False)
+        ),
+        showlegend=True,
+        margin=dict(l=40, r=40, b=40, t=40)
+    )
+    return base.to_plotly_json()
+
+def create_natal_chart(natal_chart):
+    # Returns a plain figure dict: the cached scaffolding plus this chart's planets and angles.
+    # Skipping graph_objs here avoids re-validating every trace on each request.
+    if not isinstance(natal_chart, NatalChart):
+        natal_chart = NatalChart.from_dict(natal_chart)
+    placements = {body: (sign_index, house) for body, sign_index, house in natal_chart.placements()}
+    planets = [planet for planet in placements if planet not in ["midheaven", "ic", "ascendant", "descendant"]]
+
+    # Calculate the angles based on the house number and sign position
+    angles = []
+    for planet in planets:
+        sign_index, house = placements[planet]
+        angle = ((house - 1) * 30 + sign_index * 30 / 12) % 360
+        angles.append((angle + ANGLE_CORRECTIONS.get(planet, 0)) % 360)
+
+    # Offset for overlapping planets
+    offset_radius = 0.04
+    adjusted_angles = []
+    seen_angles = {}
+
+    for angle in angles:
+        if angle in seen_angles:
+            seen_angles[angle] += 1
+            adjusted_angle = angle + seen_angles[angle] * (360 / len(planets))
+        else:
+            seen_angles[angle] = 0
+            adjusted_angle = angle
+        adjusted_angles.append(adjusted_angle)
+
+    adjusted_radii = [1 + seen_angles[angle] * offset_radius for angle in angles]
+
+    # Adding the planets
+    planet_traces = []
+    for planet, angle, radius in zip(planets, adjusted_angles, adjusted_radii):
+        sign_index, house = placements[planet]
+        sign = SimNatalChart.ZODIAC_SIGNS[sign_index]
+        planet_traces.append({
+            "type": "scatterpolar",
+            "r": [radius],
+            "theta": [angle],
+            "mode": "markers",
+            "marker": {"size": 15, "color": PLANET_COLORS[planet], "line": {"color": ELEMENT_COLORS[ZODIAC_ELEMENTS[sign]], "width": 2}},
+            "hoverinfo": "text",
+            "text": [f"{planet.capitalize()}: {sign} {house}"],
+            "showlegend": True,
+            "name": f"{planet.capitalize()} ({sign} {house})"
+        })
+
+    planet_traces.append({
+        "type": "scatterpolar",
+        "r": adjusted_radii,
+        "theta": adjusted_angles,
+        "mode": "text",
+        "text": planets,
+        "textposition": "top center",
+        "textfont": {"color": "rgba(0,0,0,0)"},
+        "hoverinfo": "none",
+        "showlegend": False
+    })
+
+    # Adding MC, IC, Ascendant, and Descendant lines, with all four labels in one trace
+    angle_traces = []
+    label_angles = []
+    for body, name, _, _ in CHART_ANGLES:
+        sign_index, house = placements[body]
+        sign = SimNatalChart.ZODIAC_SIGNS[sign_index]
+        angle = (house - 1) * 30 + (WHEEL_SIGNS.index(sign) * 30) / 12
+        label_angles.append(angle)
+        angle_traces.append({
+            "type": "scatterpolar",
+            "r": [0, 1],
+            "theta": [angle, angle],
+            "mode": "lines",
+            "line": {"color": ELEMENT_COLORS[ZODIAC_ELEMENTS[sign]], "dash": "dash", "width": 2},
+            "opacity": 0.5,
+            "showlegend": True,
+            "name": name
+        })
+
+    angle_traces.append({
+        "type": "scatterpolar",
+        "r": [1.05] * len(CHART_ANGLES),
+        "theta": label_angles,
+        "mode": "text",
+        "text": [label for _, _, label, _ in CHART_ANGLES],
+        "textposition": [position for _, _, _, position in CHART_ANGLES],
+        "hoverinfo": "none",
+        "showlegend": False
+    })
+
+    # The scaffolding is shared between requests and must not be mutated
+    base = natal_chart_base()
+    return {
+        "data": planet_traces + base["data"] + angle_traces,
+        "layout": base["layout"]
+    }
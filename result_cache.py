@@ -0,0 +1,104 @@
+#preshypily@gmail.com
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_RESULT_CACHE_SIZE = 4096
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire ttl seconds after they were stored."""
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.expirations = 0
+        self._clock = clock
+
+    def get(self, key):
+        entry = super().get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < self._clock():
+            with self._lock:
+                if self._data.get(key) is entry:
+                    del self._data[key]
+                    self.expirations += 1
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return value
+
+    def put(self, key, value):
+        super().put(key, (self._clock() + self.ttl, value))
+
+    def stats(self):
+        return dict(super().stats(), ttl=self.ttl, expirations=self.expirations)
+
+
+def chart_signature(natal_chart):
+    # Canonical hash of the (body, sign, house) placements, in chart order since ties
+    # in the legacy results are broken by that order
+    digest = hashlib.blake2b(digest_size=16)
+    for planet, info in natal_chart.items():
+        if isinstance(info, dict):
+            digest.update(f"{planet}:{info['sign']}:{info['house']};".encode())
+    return digest.hexdigest()
+
+
+# Full legacy results keyed by (workbook version, chart); size via LEGACY_RESULT_CACHE_SIZE (0 disables)
+RESULT_CACHE = LRUCache(int(os.environ.get('LEGACY_RESULT_CACHE_SIZE', DEFAULT_RESULT_CACHE_SIZE)))
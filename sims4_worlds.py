@@ -0,0 +1,49 @@
+#preshypily@gmail.com
+# World metadata shared by Sims4Globe and the globe builder; standard library only
+import math
+
+# Given areas for each location
+areas = {
+    "Willow Creek": 7147.23,
+    "Newcrest": 4712.58,
+    "Oasis Springs": 7147.23,
+    "Granite Falls": 2072.32,
+    "Magnolia Promenade": 2725.63,
+    "Windenburg": 11334.52,
+    "San Myshuno": 8493.38,
+    "Forgotten Hollow": 1648.66,
+    "Brindleton Bay": 5297.26,
+    "Selvadorada": 2067.63,
+    "Del Sol Valley": 3962.18,
+    "Strangerville": 2374.25,
+    "Sulani": 3345.12,
+    "Glimmerbrook": 1112.15,
+    "Britechester": 1904.98,
+    "Evergreen Harbor": 2145.89,
+    "Mt. Komorebi": 1975.19,
+    "Henford-On-Bagley": 2701.91,
+    "Taratosa": 1680.15,
+    "Moonwood Mill": 1657.63,
+    "Copperdale": 2266.54,
+    "San Sequoia": 2415.84,
+    "Chesnut Ridge": 2125.98
+}
+
+# Calculate the dimensions (assuming square lots)
+locations = []
+for name, area in areas.items():
+    side_length = math.sqrt(area)
+    locations.append({"name": name, "width": side_length, "height": side_length})
+
+# Distribute corresponding lat/lon values for each location more evenly across the globe
+lat_lon_values = [
+    (0, 0), (10, 30), (-10, 60), (-20, -30), (30, -60),
+    (40, 120), (-30, 150), (-20, -120), (20, -150), (50, -90),
+    (-40, 90), (0, -180), (-50, 60), (60, 30), (-60, 0),
+    (20, 90), (30, -90), (-10, 120), (10, -120), (-30, -60),
+    (40, 60), (-20, 180), (50, -150)
+]
+
+for i, (lat, lon) in enumerate(lat_lon_values):
+    locations[i]["lat"] = lat
+    locations[i]["lon"] = lon
@@ -0,0 +1,67 @@
+#preshypily@gmail.com
+# Admission control and a bounded executor for the CPU-heavy stages of a request (legacy
+# aggregation and figure building). With threaded gunicorn workers the request threads only
+# wait on these stages, so /health, static files and the Dash assets keep being served while
+# charts are computed, and requests beyond the configured limit are turned away with a 503
+# instead of piling up.
+import contextlib
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """A request was not admitted within the queue timeout."""
+
+
+class StageExecutor:
+    def __init__(self, workers, max_requests, queue_timeout):
+        # workers=0 runs stages inline; max_requests=0 admits everything
+        self.workers = workers
+        self.max_requests = max_requests
+        self.queue_timeout = queue_timeout
+        self.admitted = 0
+        self.rejected = 0
+        self.active = 0
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='legacy-stage') if workers > 0 else None
+        self._slots = threading.BoundedSemaphore(max_requests) if max_requests > 0 else None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def admit(self):
+        # Holds one of max_requests slots for the duration of the block, waiting at most queue_timeout
+        if self._slots is not None and not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"More than {self.max_requests} chart requests in flight")
+        with self._lock:
+            self.admitted += 1
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def submit(self, func, *args):
+        # func runs in a copy of the caller's context, so it sees the request's pinned workbook snapshot
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        return self._executor.submit(contextvars.copy_context().run, func, *args)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_requests": self.max_requests,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,8 @@
+#preshypily@gmail.com
+# The modules live at the repository root and read static/ relative to it
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
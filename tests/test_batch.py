@@ -0,0 +1,17 @@
+#preshypily@gmail.com
+import pytest
+
+from app import app
+
+SIM = {"sim_age": 100, "birth_location": "Willow Creek", "current_sim_day": 500,
+       "sim_year_days": 28, "sim_season_days": 7}
+
+
+@pytest.mark.parametrize('sim_age', [float('inf'), 1e400, 10 ** 400])
+def test_overflowing_item_gets_its_own_error(sim_age):
+    items = [SIM, dict(SIM, sim_age=sim_age), dict(SIM, sim_age=200)]
+    response = app.test_client().post('/api/v1/legacy:batch', json=items)
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert "error" not in results[0] and "error" not in results[2]
+    assert set(results[1]) == {"error"}
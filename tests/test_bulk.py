@@ -0,0 +1,33 @@
+#preshypily@gmail.com
+import json
+
+from bulk import process_chunk, read_rows
+
+ROW = {"sim_age": 100, "birth_location": "Willow Creek", "current_sim_day": 500}
+
+
+def test_overflowing_row_becomes_an_error_record():
+    rows = [dict(ROW, id="a"), dict(ROW, id="b", sim_age=float('inf')), dict(ROW, id="c")]
+    results = [json.loads(line) for line in process_chunk(list(enumerate(rows)))]
+    assert [result["row"] for result in results] == [0, 1, 2]
+    assert "error" not in results[0] and "error" not in results[2]
+    assert results[1]["id"] == "b" and "error" in results[1]
+
+
+def test_csv_row_with_extra_fields_becomes_an_error_record(tmp_path):
+    path = tmp_path / "sims.csv"
+    path.write_text("id,sim_age,birth_location,current_sim_day\n"
+                    "a,100,Willow Creek,500\n"
+                    "b,100,Willow Creek,500,oops,again\n")
+    results = [json.loads(line) for line in process_chunk(list(enumerate(read_rows(str(path)))))]
+    assert "error" not in results[0]
+    assert results[1] == {"row": 1, "error": "2 more field(s) than the header"}
+
+
+def test_invalid_json_line_becomes_an_error_record(tmp_path):
+    path = tmp_path / "sims.jsonl"
+    path.write_text(json.dumps(ROW) + "\n{not json\n" + '{"sim_age": 1e400, "birth_location": "Willow Creek", "current_sim_day": 1}\n')
+    results = [json.loads(line) for line in process_chunk(list(enumerate(read_rows(str(path)))))]
+    assert "error" not in results[0]
+    assert results[1]["error"].startswith("Invalid JSON")
+    assert "error" in results[2]
@@ -0,0 +1,33 @@
+#preshypily@gmail.com
+import pytest
+
+from inverse_search import InverseSearch
+
+
+@pytest.mark.parametrize('item', [5, None, ['Genius'], {'name': 'Genius'}])
+def test_resolve_rejects_non_string_items(item):
+    with pytest.raises(ValueError, match='strings'):
+        InverseSearch().resolve('traits', item)
+
+
+@pytest.fixture(scope='module')
+def client():
+    from app import app
+    return app.test_client()
+
+
+@pytest.mark.parametrize('bounds', [
+    {"first_year": 0, "last_year": 1000, "sim_year_days": 2000},
+    {"first_year": 0, "last_year": 3999, "sim_year_days": 56},
+    {"first_year": 0, "last_year": 10, "sim_year_days": 0},
+])
+def test_search_rejects_too_many_birth_dates(client, bounds):
+    response = client.post('/api/v1/legacy:search', json=dict(bounds, want={"traits": ["Genius"]}))
+    assert response.status_code == 400
+
+
+def test_search_rejects_non_string_items_and_clamps_limit(client):
+    response = client.post('/api/v1/legacy:search', json={"want": {"traits": [5]}})
+    assert response.status_code == 400
+    response = client.post('/api/v1/legacy:search', json={"want": {"traits": ["Genius"]}, "limit": -3})
+    assert response.status_code == 200 and len(response.get_json()["results"]) == 1
@@ -0,0 +1,98 @@
+#preshypily@gmail.com
+# The top-6/top-20 selection with count_tokens' first-seen tie-break is implemented three
+# times: per chart (CreateLegacyChallenge.aggregate_natal_chart), in batches (LegacyScorer)
+# and per heir from partial sums (GenerationPlanner). These tests hold the two fast paths to
+# the per-chart one.
+import numpy as np
+import pytest
+
+from legacy_data import CATEGORIES, get_interpretation_index
+from legacy_planner import GenerationPlanner
+from legacy_scoring import N_BODIES, get_scorer
+from main import CreateLegacyChallenge, NatalChart, SimNatalChart
+from sims4_globe import GLOBE, LOT_TILES
+
+SIM_YEAR_DAYS, SIM_SEASON_DAYS, CURRENT_SIM_DAY = 28, 7, 30000
+
+
+def reference(natal_chart, index):
+    return CreateLegacyChallenge(natal_chart).aggregate_natal_chart(index)
+
+
+def ordered(result):
+    # Lists and dicts with their order, which the results page shows as is
+    return tuple(list(part.items()) if isinstance(part, dict) else list(part) for part in result)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return get_interpretation_index()
+
+
+@pytest.fixture(scope='module')
+def generated_charts():
+    # Every world at its centre and one off-centre lot, over birth days spread across millennia
+    charts = []
+    for number, world in enumerate(GLOBE.world_locations):
+        for x, z in ((0, 0), (LOT_TILES * (number % 5 - 2), LOT_TILES * (2 - number % 4))):
+            location = GLOBE.get_location(world, x, 0, z)
+            for sim_age in range(0, 30000, 1999):
+                charts.append(SimNatalChart(sim_age, location, CURRENT_SIM_DAY, SIM_YEAR_DAYS, SIM_SEASON_DAYS))
+    return [chart['planetary_positions'] for chart in SimNatalChart.generate_natal_charts(charts)]
+
+
+@pytest.fixture(scope='module')
+def arbitrary_charts():
+    # Any sign with any house, which generated charts never have, so far more workbook rows match
+    rng = np.random.default_rng(2024)
+    signs = rng.integers(0, 12, size=(2000, N_BODIES))
+    houses = rng.integers(1, 13, size=(2000, N_BODIES))
+    return [NatalChart(row) for row in (signs << 4 | houses).astype(np.uint8)]
+
+
+def codes_of(natal_charts):
+    return np.frombuffer(b''.join(chart.codes for chart in natal_charts), dtype=np.uint8).reshape(-1, N_BODIES)
+
+
+@pytest.mark.parametrize('charts', ['generated_charts', 'arbitrary_charts'])
+def test_scorer_matches_per_chart_aggregation(charts, index, request):
+    natal_charts = request.getfixturevalue(charts)
+    scored = get_scorer(index).score(codes_of(natal_charts))
+    for natal_chart, result in zip(natal_charts, scored):
+        assert ordered(result) == ordered(reference(natal_chart, index)), natal_chart
+
+
+def test_outcome_counts_match_scored_results(arbitrary_charts, index):
+    scorer = get_scorer(index)
+    codes = codes_of(arbitrary_charts)
+    weights = np.arange(1, len(codes) + 1)
+    expected = {}
+    for weight, result in zip(weights.tolist(), scorer.score(codes)):
+        for category, part in zip(CATEGORIES, result):
+            for item in part:
+                token = item.rsplit(' (', 1)[0] if category.endswith('_skills') else item
+                key = (category, token)
+                expected[key] = expected.get(key, 0) + weight
+    totals = scorer.outcome_counts(codes, weights)
+    tokens = scorer.tokens.tolist()
+    counted = {
+        (category, tokens[column]): int(totals[column])
+        for category, start, stop in zip(CATEGORIES, scorer.offsets, scorer.offsets[1:])
+        for column in range(start, stop) if totals[column]
+    }
+    assert counted == expected
+
+
+def test_planner_matches_per_chart_aggregation(index):
+    planner = GenerationPlanner(index)
+    timelines = [
+        {'birth_location': world, 'heirs': list(range(-29000, 1, 977))}
+        for world in GLOBE.world_locations
+    ]
+    plans = planner.plan_many(timelines, CURRENT_SIM_DAY, SIM_YEAR_DAYS, SIM_SEASON_DAYS)
+    # Twice, so the second pass comes from the planner's slow-partial and legacy caches
+    for _ in range(2):
+        for heir in (heir for plan in plans for heir in plan):
+            expected = ordered(reference(NatalChart.from_dict(heir['natal_chart']), index))
+            assert ordered([heir[category] for category in CATEGORIES]) == expected, heir['birth_day']
+        plans = planner.plan_many(timelines, CURRENT_SIM_DAY, SIM_YEAR_DAYS, SIM_SEASON_DAYS)
@@ -0,0 +1,61 @@
+#preshypily@gmail.com
+import numpy as np
+import pytest
+
+from main import NatalChart, SimNatalChart
+from sims4_globe import GLOBE
+
+
+def test_assign_to_zodiac_and_houses_reads_positions_by_body():
+    location = GLOBE.get_location(next(iter(GLOBE.world_locations)), 0, 0, 0)
+    natal_chart = SimNatalChart(500, location, 30000)
+    positions = natal_chart.calculate_planetary_positions(natal_chart.jd)
+    reordered = dict(reversed(list(positions.items())))
+    assert natal_chart.assign_to_zodiac_and_houses(reordered) == natal_chart.assign_to_zodiac_and_houses(positions)
+
+
+def generated_chart():
+    location = GLOBE.get_location(next(iter(GLOBE.world_locations)), 0, 0, 0)
+    natal_chart = SimNatalChart(500, location, 30000)
+    return natal_chart.assign_to_zodiac_and_houses(natal_chart.calculate_planetary_positions(natal_chart.jd))
+
+
+def test_token_and_dict_round_trip():
+    natal_chart = generated_chart()
+    assert NatalChart.from_token(natal_chart.token) == natal_chart
+    assert NatalChart.from_dict(natal_chart.to_dict()) == natal_chart
+
+
+@pytest.mark.parametrize('code', [0x00, 0x0D, 0x10 | 15, 0xC1, 0xF5])
+def test_from_token_rejects_out_of_range_placements(code):
+    token = generated_chart().token
+    with pytest.raises(ValueError):
+        NatalChart.from_token(f"{code:02x}" + token[2:])
+
+
+@pytest.mark.parametrize('placement', [
+    {"sign": "Aries", "house": 16},
+    {"sign": "Aries", "house": 0},
+    {"sign": "Aries", "house": 13},
+    {"sign": "Aries", "house": "3"},
+    {"sign": "Ophiuchus", "house": 3},
+])
+def test_from_dict_rejects_out_of_range_placements(placement):
+    zodiac_chart = generated_chart().to_dict()
+    zodiac_chart["moon"] = placement
+    with pytest.raises(ValueError):
+        NatalChart.from_dict(zodiac_chart)
+
+
+@pytest.mark.parametrize('sim_year_days, sim_season_days', [(28, 7), (56, 14), (112, 28), (7, 7)])
+def test_scalar_and_batch_ephemeris_agree(monkeypatch, sim_year_days, sim_season_days):
+    # generate_natal_chart (math, one chart) against generate_natal_charts (NumPy, whole batch)
+    monkeypatch.setattr(SimNatalChart, 'CHART_TABLE', None)
+    rng = np.random.default_rng(sim_year_days)
+    natal_charts = [
+        SimNatalChart(int(sim_age), {'latitude': float(latitude)}, 100000, sim_year_days, sim_season_days)
+        for sim_age, latitude in zip(rng.integers(0, 100000, 500), rng.uniform(-89, 89, 500))
+    ]
+    batch = SimNatalChart.generate_natal_charts(natal_charts)
+    for natal_chart, generated in zip(natal_charts, batch):
+        assert natal_chart.generate_natal_chart() == generated, (natal_chart.birthdate, natal_chart.birth_location)